@@ -0,0 +1,123 @@
+"""
+Asynchronous buzzer and relay control
+
+Requests are recorded and return immediately; a dedicated thread drives the
+GPIO outputs. Overlapping buzzer requests are merged into one continuous
+sound instead of being played back to back, and several pending changes of
+the same relay collapse into the last one.
+"""
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ActuatorScheduler:
+    """Drives the buzzer and relays from a background thread"""
+    def __init__(self, set_buzzer_state, set_relay_state):
+        self._set_buzzer_state = set_buzzer_state
+        self._set_relay_state = set_relay_state
+        self._condition = threading.Condition()
+        self._intervals = []        # Sorted, disjoint (start, end) buzzer on-times
+        self._pending_relays = {}   # pin -> state waiting to be applied
+        self._buzzer_on = False
+        self.relay_states = {}      # pin -> state last applied
+        self._thread = None
+        self._stopping = False
+
+    def buzz(self, duration=1.0, repeat=1, pause=0.5):
+        """Sound the buzzer `repeat` times for `duration` seconds, `pause` seconds apart"""
+        now = time.monotonic()
+        with self._condition:
+            for n in range(repeat):
+                start = now + n * (duration + pause)
+                self._add_interval(start, start + duration)
+            self._wake()
+
+    def set_relay(self, pin, state):
+        """Switch a relay; only the latest request per pin is applied"""
+        with self._condition:
+            self._pending_relays[pin] = state
+            self._wake()
+
+    def reset_relay(self, pin):
+        """Forget the last state applied to a pin, e.g. after it was set up again"""
+        with self._condition:
+            self.relay_states.pop(pin, None)
+
+    def silence(self):
+        """Cancel any buzzing in progress or scheduled"""
+        with self._condition:
+            self._intervals = []
+            self._wake()
+
+    @property
+    def buzzer_on(self):
+        return self._buzzer_on
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _add_interval(self, start, end):
+        # Merge with every interval the new one overlaps or touches
+        merged = []
+        for interval_start, interval_end in self._intervals:
+            if interval_end < start or interval_start > end:
+                merged.append((interval_start, interval_end))
+            else:
+                start = min(start, interval_start)
+                end = max(end, interval_end)
+        merged.append((start, end))
+        merged.sort()
+        self._intervals = merged
+
+    def _wake(self):
+        # Called with the condition held; the thread is started on first use
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='actuators', daemon=True)
+            self._thread.start()
+        self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopping:
+                        if self._buzzer_on:
+                            self._apply(self._set_buzzer_state, False)
+                            self._buzzer_on = False
+                        return
+                    now = time.monotonic()
+                    self._intervals = [interval for interval in self._intervals if interval[1] > now]
+                    buzzer_on = bool(self._intervals) and self._intervals[0][0] <= now
+                    if self._pending_relays or buzzer_on != self._buzzer_on:
+                        break
+
+                    timeout = None
+                    if self._intervals:
+                        next_change = self._intervals[0][1] if buzzer_on else self._intervals[0][0]
+                        timeout = max(0.0, next_change - now)
+                    self._condition.wait(timeout)
+
+                relays, self._pending_relays = self._pending_relays, {}
+
+            # GPIO calls happen outside the lock so requests never wait on hardware
+            for pin, state in relays.items():
+                if self.relay_states.get(pin) != state and self._apply(self._set_relay_state, pin, state):
+                    self.relay_states[pin] = state
+            if buzzer_on != self._buzzer_on:
+                self._apply(self._set_buzzer_state, buzzer_on)
+                self._buzzer_on = buzzer_on
+
+    def _apply(self, function, *args):
+        try:
+            return function(*args) is not False
+        except Exception as e:
+            logger.error(f"Error driving actuator: {e}")
+            return False
@@ -38,12 +38,16 @@ scheduler = BackgroundScheduler()
 
 with app.app_context():
     # Import models to ensure they're registered with SQLAlchemy
-    from models import Fridge, TemperatureReading, DoorEvent, MaintenanceRecord, Alert
+    from models import Fridge, TemperatureReading, ReadingRollup, DoorEvent, MaintenanceRecord, Alert
     
     # Create tables
     db.create_all()
     logger.info("Database tables created")
     
+    # Add indexes and other schema changes missing from older databases
+    from migrations import upgrade_schema
+    upgrade_schema()
+    
     # Custom Jinja filters
     @app.template_filter('now')
     def filter_now(format_string):
@@ -0,0 +1 @@
+"""Performance benchmarks for the Fridge Monitor system (simulation mode)"""
@@ -0,0 +1,58 @@
+"""
+Dashboard benchmark and query-count regression check
+
+Renders the index page with a growing number of fridges and verifies the
+number of SQL statements stays constant. Exits with status 1 if it grows.
+
+Usage:
+    python -m benchmarks.bench_dashboard [max_fridges]
+"""
+import sys
+
+from benchmarks.common import load_app, add_fridges, seed_history, Timer, QueryCounter
+
+def run(max_fridges=40, hours=6):
+    app = load_app()
+    
+    from models import Fridge
+    from cache import response_cache
+    
+    results = []
+    with app.app_context():
+        seed_history([fridge.id for fridge in Fridge.query.all()], hours=hours)
+        client = app.test_client()
+        
+        while True:
+            fridge_count = Fridge.query.count()
+            # Warm-up render so one-off cache loads are not counted, then
+            # drop the cached page so the measured request renders it again
+            response_cache.clear()
+            client.get('/')
+            response_cache.clear()
+            with QueryCounter() as counter, Timer() as timer:
+                response = client.get('/')
+            assert response.status_code == 200
+            results.append({
+                'fridges': fridge_count,
+                'queries': counter.count,
+                'render_seconds': timer.elapsed
+            })
+            
+            if fridge_count >= max_fridges:
+                break
+            new_ids = add_fridges(min(fridge_count, max_fridges - fridge_count))
+            seed_history(new_ids, hours=hours)
+    
+    return results
+
+if __name__ == '__main__':
+    max_fridges = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    results = run(max_fridges)
+    for result in results:
+        print(f"{result['fridges']:4d} fridges: {result['queries']:3d} queries, "
+              f"{result['render_seconds'] * 1000:.1f} ms")
+    
+    if len({result['queries'] for result in results}) != 1:
+        print("FAIL: dashboard query count grows with the number of fridges")
+        sys.exit(1)
+    print("OK: dashboard query count is constant")
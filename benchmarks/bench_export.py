@@ -0,0 +1,47 @@
+"""
+Export benchmark: throughput and peak Python memory of the streaming exports
+
+Usage:
+    python -m benchmarks.bench_export [rows]
+"""
+import sys
+import tracemalloc
+
+from benchmarks.common import load_app, seed_history, Timer
+
+def run(rows=1000000, sample_seconds=30):
+    app = load_app()
+    
+    from models import Fridge
+    
+    results = []
+    with app.app_context():
+        fridge = Fridge.query.first()
+        seed_history([fridge.id], hours=rows * sample_seconds / 3600, sample_seconds=sample_seconds)
+        client = app.test_client()
+        
+        for export_format in ('csv', 'ndjson'):
+            tracemalloc.start()
+            exported = 0
+            with Timer() as timer:
+                response = client.get(f'/api/export/{fridge.id}/readings?format={export_format}', buffered=False)
+                for chunk in response.response:
+                    exported += len(chunk)
+                response.close()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            results.append({
+                'format': export_format,
+                'rows': rows,
+                'bytes': exported,
+                'rows_per_sec': rows / timer.elapsed,
+                'peak_memory_mb': peak / 1024 / 1024
+            })
+    return results
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for result in run(rows):
+        print(f"{result['format']:7s} {result['rows']} rows, {result['bytes'] / 1024 / 1024:.1f} MB: "
+              f"{result['rows_per_sec']:.0f} rows/sec, peak {result['peak_memory_mb']:.1f} MB")
@@ -0,0 +1,65 @@
+"""
+Ingestion benchmark: per-object ORM inserts vs batched multi-row inserts
+
+Usage:
+    python -m benchmarks.bench_ingestion [rows]
+"""
+import sys
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import load_app, Timer
+
+def run(rows=20000, batch_size=500):
+    app = load_app()
+    
+    from app import db
+    from models import Fridge, TemperatureReading
+    from ingestion import ReadingBuffer
+    
+    with app.app_context():
+        fridge_ids = [fridge.id for fridge in Fridge.query.all()]
+        start = datetime.utcnow() - timedelta(seconds=rows)
+        samples = [
+            (fridge_ids[i % len(fridge_ids)], random.uniform(2, 6), random.uniform(30, 50), start + timedelta(seconds=i))
+            for i in range(rows)
+        ]
+        
+        # Current path: one ORM object per reading, committed once per batch
+        with Timer() as orm_timer:
+            for i, (fridge_id, temperature, humidity, timestamp) in enumerate(samples, 1):
+                db.session.add(TemperatureReading(
+                    fridge_id=fridge_id,
+                    temperature=temperature,
+                    humidity=humidity,
+                    timestamp=timestamp
+                ))
+                if i % batch_size == 0:
+                    db.session.commit()
+            db.session.commit()
+        
+        # Batched path: buffered rows written with one executemany per batch
+        buffer = ReadingBuffer(batch_size=batch_size, flush_interval=float('inf'))
+        with Timer() as batch_timer:
+            for fridge_id, temperature, humidity, timestamp in samples:
+                buffer.add(fridge_id, temperature, humidity, timestamp)
+                if buffer.should_flush():
+                    buffer.flush()
+                    db.session.commit()
+            buffer.flush()
+            db.session.commit()
+    
+    return {
+        'rows': rows,
+        'batch_size': batch_size,
+        'orm_rows_per_sec': rows / orm_timer.elapsed,
+        'batched_rows_per_sec': rows / batch_timer.elapsed,
+        'speedup': orm_timer.elapsed / batch_timer.elapsed
+    }
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    result = run(rows)
+    print(f"Per-object ORM insert: {result['orm_rows_per_sec']:.0f} rows/sec")
+    print(f"Batched insert:        {result['batched_rows_per_sec']:.0f} rows/sec")
+    print(f"Speedup:               {result['speedup']:.1f}x")
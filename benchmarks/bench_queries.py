@@ -0,0 +1,67 @@
+"""
+Query latency benchmark with and without the composite indexes
+
+Seeds a large history (1M readings by default), then times the main read
+paths once with the model indexes dropped and once with them in place.
+
+Usage:
+    python -m benchmarks.bench_queries [rows]
+"""
+import sys
+
+from benchmarks.common import load_app, seed_history, Timer
+
+def _time(func, repeat=5):
+    """Best-of-N wall-clock time of func() in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        with Timer() as timer:
+            func()
+        best = timer.elapsed if best is None else min(best, timer.elapsed)
+    return best * 1000
+
+def _measure(fridge):
+    from utils import get_temperature_data, calculate_daily_stats
+    
+    return {
+        # points=None returns raw readings, so the timing covers the reading index, not the rollups
+        'get_temperature_data_ms': _time(lambda: get_temperature_data(fridge.id, days=1, points=None)),
+        'is_door_open_ms': _time(fridge.is_door_open),
+        'calculate_daily_stats_ms': _time(lambda: calculate_daily_stats(fridge.id)),
+    }
+
+def run(rows=1000000, sample_seconds=30):
+    app = load_app()
+    
+    from app import db
+    from models import Fridge
+    from migrations import ensure_indexes
+    
+    with app.app_context():
+        fridges = Fridge.query.all()
+        hours = rows * sample_seconds / 3600 / len(fridges)
+        seed_history([fridge.id for fridge in fridges], hours=hours, sample_seconds=sample_seconds)
+        fridge = fridges[0]
+        
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(bind=db.engine)
+        before = _measure(fridge)
+        
+        with Timer() as index_timer:
+            ensure_indexes()
+        after = _measure(fridge)
+    
+    return {
+        'rows': rows,
+        'index_build_seconds': index_timer.elapsed,
+        'without_indexes': before,
+        'with_indexes': after
+    }
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    result = run(rows)
+    print(f"{result['rows']} readings, index build {result['index_build_seconds']:.1f} s")
+    for name in result['without_indexes']:
+        print(f"{name:28s} {result['without_indexes'][name]:9.2f} ms -> {result['with_indexes'][name]:9.2f} ms")
@@ -0,0 +1,38 @@
+"""
+Replay benchmark: days of synthetic operation through the real control loop
+
+Usage:
+    python -m benchmarks.bench_replay [days] [fridges]
+"""
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import load_app, add_fridges
+
+def run(days=1, fridges=2, sample_seconds=30, door_events_per_hour=4, flush_interval=60, seed=1):
+    app = load_app()
+
+    from models import Fridge
+    from fridge_config import fridge_configs
+    from replay import ReplayDriver, synthetic_trace
+
+    with app.app_context():
+        add_fridges(max(0, fridges - Fridge.query.count()))
+        settings = fridge_configs.current().select()
+
+    start = datetime.utcnow() - timedelta(days=days)
+    trace = synthetic_trace(settings, start, days=days, sample_seconds=sample_seconds,
+                            door_events_per_hour=door_events_per_hour, seed=seed)
+    return ReplayDriver(app, flush_interval=flush_interval).run(trace)
+
+if __name__ == '__main__':
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    fridges = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    result = run(days, fridges)
+    print(f"Simulated {result['simulated_seconds'] / 86400:.1f} days in {result['elapsed_seconds']:.2f} s "
+          f"({result['speedup']:.0f}x real time)")
+    print(f"Polling cycles:  {result['cycles']} ({result['cycles_per_second']:.0f} cycles/sec)")
+    print(f"Readings stored: {result['stored_readings']}, door edges: {result['door_edges']}")
+    print(f"Relay switches:  {result['relay_switches']}, buzzer requests: {result['buzzes']}")
+    for alert_type, count in sorted(result['alerts'].items()):
+        print(f"Alerts {alert_type + ':':16s} {count}")
@@ -0,0 +1,150 @@
+"""
+Shared helpers for the benchmark scripts
+
+Benchmarks run against a throwaway SQLite database in simulation mode. The
+database URL has to be set before the application module is imported, so
+always import `app` through `load_app()`.
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+
+# Make the application modules importable when run as `python -m benchmarks.<name>`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def load_app(db_path=None):
+    """Import the Flask app bound to a fresh benchmark database"""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='fridge_bench_'), 'bench.db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    
+    from app import app, scheduler
+    
+    # The background jobs would compete with the code being measured
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    
+    # Run check_fridges inline so the benchmarks time a whole cycle
+    from sensor_handlers import ingestion_pipeline
+    from polling import poll_scheduler
+    ingestion_pipeline.stop()
+    poll_scheduler.detach()
+    logging.disable(logging.INFO)
+    return app
+
+class Timer:
+    """Context manager measuring wall-clock time in seconds"""
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+def add_fridges(count):
+    """Create `count` extra fridges with unique simulated pins, returns their IDs"""
+    from app import db
+    from models import Fridge
+    
+    existing = Fridge.query.count()
+    fridges = []
+    for n in range(existing, existing + count):
+        fridges.append(Fridge(
+            name=f"Bench Fridge {n + 1}",
+            description="Benchmark fridge",
+            dht22_pin=1000 + 3 * n,
+            door_sensor_pin=1001 + 3 * n,
+            relay_pin=1002 + 3 * n
+        ))
+    db.session.add_all(fridges)
+    db.session.commit()
+    
+    from fridge_config import fridge_configs
+    fridge_configs.refresh()
+    return [fridge.id for fridge in fridges]
+
+def seed_history(fridge_ids, hours=24, sample_seconds=30, door_events_per_hour=4, end=None):
+    """Insert synthetic readings and door open/close pairs ending at `end` (default now)"""
+    import random
+    from datetime import datetime, timedelta
+    from app import db
+    from models import TemperatureReading, DoorEvent
+    
+    end = end or datetime.utcnow()
+    start = end - timedelta(hours=hours)
+    samples = int(hours * 3600 / sample_seconds)
+    
+    for fridge_id in fridge_ids:
+        readings = [{
+            'fridge_id': fridge_id,
+            'temperature': 4.0 + random.uniform(-1.5, 1.5),
+            'humidity': 40.0 + random.uniform(-5, 5),
+            'timestamp': start + timedelta(seconds=i * sample_seconds)
+        } for i in range(samples)]
+        for offset in range(0, len(readings), 10000):
+            db.session.execute(TemperatureReading.__table__.insert(), readings[offset:offset + 10000])
+        
+        door_events = []
+        for _ in range(int(hours * door_events_per_hour)):
+            opened_at = start + timedelta(seconds=random.uniform(0, hours * 3600 - 120))
+            door_events.append({'fridge_id': fridge_id, 'event_type': 'open', 'timestamp': opened_at})
+            door_events.append({
+                'fridge_id': fridge_id,
+                'event_type': 'close',
+                'timestamp': opened_at + timedelta(seconds=random.uniform(5, 90))
+            })
+        if door_events:
+            db.session.execute(DoorEvent.__table__.insert(), door_events)
+    db.session.commit()
+    
+    from rollups import rebuild_rollups
+    rebuild_rollups(since=start)
+    return samples * len(fridge_ids)
+
+def summarize(durations):
+    """Distribution of a list of durations in seconds, reported in milliseconds"""
+    ordered = sorted(durations)
+    
+    def rank(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+    
+    return {
+        'unit': 'ms',
+        'samples': len(ordered),
+        'min': ordered[0] * 1000,
+        'median': rank(0.5),
+        'p95': rank(0.95),
+        'max': ordered[-1] * 1000,
+        'mean': sum(ordered) / len(ordered) * 1000
+    }
+
+def time_repeated(func, repeat):
+    """Run func() `repeat` times and return the list of durations in seconds"""
+    durations = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            func()
+        durations.append(timer.elapsed)
+    return durations
+
+class QueryCounter:
+    """Context manager counting SQL statements executed on the app's engine"""
+    def __enter__(self):
+        from sqlalchemy import event
+        from app import db
+        
+        self.count = 0
+        self._engine = db.engine
+        event.listen(self._engine, 'before_cursor_execute', self._on_execute)
+        return self
+    
+    def _on_execute(self, *args):
+        self.count += 1
+    
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self._engine, 'before_cursor_execute', self._on_execute)
+        return False
@@ -0,0 +1,168 @@
+"""
+End-to-end benchmark suite with machine-readable results
+
+Seeds a simulation-mode database of the requested size (fridges x days x
+sample rate, plus one day of already expired history for the cleanup) and
+measures the main ingestion, query and dashboard paths. Results are written
+as JSON so they can be stored per commit and compared; with --baseline the
+run fails (exit status 1) when a metric regressed by more than --tolerance.
+
+Usage:
+    python -m benchmarks.suite [--fridges 10] [--days 7] [--sample-seconds 30]
+                               [--output results.json] [--baseline old.json]
+"""
+import sys
+import json
+import platform
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+
+from benchmarks.common import load_app, add_fridges, seed_history, summarize, time_repeated, Timer
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _rate(count, seconds, unit):
+    return {'unit': unit, 'value': count / seconds, 'higher_is_better': True}
+
+def run(fridges=10, days=7, sample_seconds=30, repeat=5, cycles=20, ingest_rows=20000):
+    app = load_app()
+
+    from app import db
+    from config import Config
+    from models import Fridge
+    from cache import response_cache
+    from ingestion import ReadingBuffer
+    from sensor_handlers import check_fridges
+    from utils import calculate_daily_stats, get_temperature_data, cleanup_old_data
+
+    results = {}
+    with app.app_context():
+        fridge_ids = [fridge.id for fridge in Fridge.query.all()]
+        fridge_ids += add_fridges(max(0, fridges - len(fridge_ids)))
+
+        # Current history plus a day that is already past the retention period
+        expired_end = datetime.utcnow() - timedelta(days=Config.TEMP_DATA_RETENTION_DAYS + 1)
+        with Timer() as seed_timer:
+            seeded = seed_history(fridge_ids, hours=days * 24, sample_seconds=sample_seconds)
+            expired = seed_history(fridge_ids, hours=24, sample_seconds=sample_seconds, end=expired_end)
+        results['seed'] = _rate(seeded + expired, seed_timer.elapsed, 'rows/s')
+
+        # One polling cycle over every fridge, all pipeline stages inline
+        check_fridges()
+        results['check_fridges_cycle'] = summarize(time_repeated(check_fridges, cycles))
+
+        # Raw ingestion throughput of the batched insert path
+        buffer = ReadingBuffer(flush_interval=float('inf'))
+        start = datetime.utcnow() - timedelta(seconds=ingest_rows)
+        with Timer() as ingest_timer:
+            for i in range(ingest_rows):
+                buffer.add(fridge_ids[i % len(fridge_ids)], 4.0, 40.0, start + timedelta(seconds=i))
+                if buffer.should_flush():
+                    buffer.flush()
+                    db.session.commit()
+            buffer.flush()
+            db.session.commit()
+        results['ingestion'] = _rate(ingest_rows, ingest_timer.elapsed, 'readings/s')
+
+        fridge_id = fridge_ids[0]
+        results['calculate_daily_stats'] = summarize(time_repeated(lambda: calculate_daily_stats(fridge_id), repeat))
+        results['get_temperature_data_1d'] = summarize(time_repeated(lambda: get_temperature_data(fridge_id, days=1), repeat))
+        results['get_temperature_data_full'] = summarize(time_repeated(lambda: get_temperature_data(fridge_id, days=days), repeat))
+
+        # Dashboard render, rebuilt from the database and served from the response cache
+        client = app.test_client()
+        client.get('/')
+
+        def render_uncached():
+            response_cache.clear()
+            assert client.get('/').status_code == 200
+
+        results['index_render_uncached'] = summarize(time_repeated(render_uncached, repeat))
+        results['index_render_cached'] = summarize(time_repeated(lambda: client.get('/'), repeat))
+
+        with Timer() as cleanup_timer:
+            cleanup = cleanup_old_data() or {}
+        results['cleanup_old_data'] = {
+            'unit': 'ms',
+            'value': cleanup_timer.elapsed * 1000,
+            'rows_deleted': sum(table['deleted'] for table in cleanup.values())
+        }
+
+    return {
+        'suite': 'fridge-monitor',
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'fridges': len(fridge_ids),
+            'days': days,
+            'sample_seconds': sample_seconds,
+            'repeat': repeat,
+            'cycles': cycles,
+            'ingest_rows': ingest_rows
+        },
+        'results': results
+    }
+
+def headline(result):
+    """The single number compared between runs"""
+    return result['median'] if 'median' in result else result['value']
+
+def compare(current, baseline, tolerance):
+    """Return (name, baseline, current, change) for every metric worse than `tolerance`"""
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or not headline(previous):
+            continue
+        change = headline(result) / headline(previous) - 1
+        if result.get('higher_is_better'):
+            change = -change
+        if change > tolerance:
+            regressions.append((name, headline(previous), headline(result), change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fridge Monitor benchmark suite")
+    parser.add_argument('--fridges', type=int, default=10)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--sample-seconds', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5, help="Repetitions per query benchmark")
+    parser.add_argument('--cycles', type=int, default=20, help="check_fridges cycles to time")
+    parser.add_argument('--ingest-rows', type=int, default=20000)
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run(args.fridges, args.days, args.sample_seconds, args.repeat, args.cycles, args.ingest_rows)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        for name, result in report['results'].items():
+            print(f"{name:28s} {headline(result):12.2f} {result['unit']}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.2f} -> {after:.2f} ({change:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Response cache for the dashboard and JSON API
+
+Entries are keyed by (endpoint, fridge_id, *params) and dropped when the
+write paths report a change for that fridge, so views are only recomputed
+after new readings, door events or alert changes. A TTL bounds staleness
+for anything the invalidation hooks do not cover.
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+class TTLCache:
+    """Bounded LRU cache with per-entry expiry and hit/miss counters"""
+    def __init__(self, max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl=Config.RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Data versions used for ETags; bumped by every invalidation
+        self._boot_id = os.urandom(4).hex()
+        self._global_version = 0
+        self._fridge_versions = {}
+        self._clears = 0
+    
+    def get(self, key):
+        """Return (True, value) for a fresh entry, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+    
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+    
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for `key`, calling `compute()` on a miss
+        
+        A value computed while the key was invalidated may already be stale,
+        so it is returned but not stored.
+        """
+        found, value = self.get(key)
+        if not found:
+            with self._lock:
+                version = self._version(key)
+            value = compute()
+            with self._lock:
+                if self._version(key) == version:
+                    self._store(key, value)
+        return value
+    
+    def _version(self, key):
+        fridge_id = key[1]
+        if fridge_id is None:
+            return self._global_version
+        return (self._clears, self._fridge_versions.get(fridge_id, 0))
+    
+    def invalidate_fridge(self, fridge_id):
+        """Drop entries for a fridge plus all entries not tied to a single fridge"""
+        with self._lock:
+            stale = [key for key in self._entries if key[1] is None or key[1] == fridge_id]
+            for key in stale:
+                del self._entries[key]
+            self._fridge_versions[fridge_id] = self._fridge_versions.get(fridge_id, 0) + 1
+            self._global_version += 1
+            self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._global_version += 1
+            self._clears += 1
+            self.invalidations += 1
+    
+    def etag(self, key):
+        """
+        Strong ETag for the data behind `key`
+        
+        Changes whenever the fridge (or, for keys without a fridge, any fridge)
+        is invalidated, and on restart. The key parameters are hashed so the
+        tag stays a valid entity-tag whatever they contain.
+        """
+        with self._lock:
+            version = self._version(key)
+        if isinstance(version, tuple):
+            version = '.'.join(str(part) for part in version)
+        params = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return f"{self._boot_id}-{version}-{params}"
+    
+    def window_key(self, key):
+        """
+        Extend `key` with the current TTL-sized time bucket
+        
+        For views over a sliding time window ("the last N days"), whose data
+        changes as the window moves even when nothing is written.
+        """
+        return key + (int(time.time() // self.ttl),)
+    
+    def stats(self):
+        """Counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+            'invalidations': self.invalidations
+        }
+
+# Cache shared by all views
+response_cache = TTLCache()
@@ -0,0 +1,54 @@
+"""
+Injectable time source for the control loop
+
+Code on the polling, door and alert paths asks `clock.utcnow()` for the
+current time instead of calling `datetime.utcnow()` directly. Normally that
+is the wall clock; replays and tests swap in a ManualClock with
+`clock.use(...)` and move time forward themselves.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+class SystemClock:
+    """Wall-clock UTC time"""
+    def utcnow(self):
+        return datetime.utcnow()
+
+class ManualClock:
+    """Clock that only moves when told to"""
+    def __init__(self, start=None):
+        self._now = start or datetime.utcnow()
+        self._lock = threading.Lock()
+
+    def utcnow(self):
+        return self._now
+
+    def set(self, moment):
+        with self._lock:
+            self._now = moment
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+            return self._now
+
+class Clock:
+    """Delegates to the active time source"""
+    def __init__(self, source=None):
+        self.source = source or SystemClock()
+
+    def utcnow(self):
+        return self.source.utcnow()
+
+    @contextmanager
+    def use(self, source):
+        """Make `source` the time source for the duration of the block"""
+        previous, self.source = self.source, source
+        try:
+            yield source
+        finally:
+            self.source = previous
+
+# Time source shared by the control loop
+clock = Clock()
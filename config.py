@@ -15,6 +15,51 @@ class Config:
     DEFAULT_MIN_TEMP = 2.0     # Default minimum temperature threshold
     DEFAULT_MAX_TEMP = 8.0     # Default maximum temperature threshold
     DOOR_OPEN_ALERT_SECONDS = 60  # Alert after door open for 60 seconds
+    SITE_TIMEZONE = os.environ.get('SITE_TIMEZONE', 'UTC')  # Timezone used to decide what "today" is
+    
+    DOOR_DEBOUNCE_SECONDS = 0.3   # Door edges closer together than this are one state change
+    DOOR_EVENT_BATCH_SECONDS = 0.2  # How long the door event worker gathers edges before writing
+    
+    # Sensor polling settings
+    SENSOR_POLL_WORKERS = 8           # Maximum number of DHT22 sensors read concurrently
+    SENSOR_READ_TIMEOUT_SECONDS = 20  # Give up on sensors that have not answered by then
+    POLL_INTERVAL_SECONDS = 30        # Default sampling interval of a fridge
+    ADAPTIVE_POLL_FAST_SECONDS = 5    # Sampling interval after door events or threshold excursions
+    ADAPTIVE_POLL_BACKOFF = 1.5       # Interval growth per stable sample
+    ADAPTIVE_POLL_MAX_FACTOR = 4      # Stable fridges back off to at most this multiple of their base interval
+    ADAPTIVE_POLL_STABLE_DELTA = 0.3  # Temperature change (°C) between samples within sensor noise
+    ADAPTIVE_POLL_STABLE_RATE = 1.0   # Rate of change (°C per minute) still considered stable
+    PIPELINE_QUEUE_SIZE = 1000        # Bounded queue between acquire, evaluate and actuate stages
+    PIPELINE_PERSIST_QUEUE_SIZE = 10000  # Decisions waiting for the database; oldest dropped when full
+    
+    # Reading ingestion settings
+    READING_BATCH_SIZE = 500              # Flush buffered readings once this many are pending
+    READING_FLUSH_INTERVAL_SECONDS = 0    # Flush buffered readings at least this often (0 = every cycle)
+    RECENT_READINGS_CAPACITY = 120        # Readings kept in memory per fridge for "latest" queries
+    
+    # Live update stream settings
+    EVENT_STREAM_QUEUE_SIZE = 100         # Events buffered per client before the oldest are dropped
+    EVENT_STREAM_KEEPALIVE_SECONDS = 15   # Send a comment line when idle to keep proxies from closing
+    EVENT_STREAM_MAX_SECONDS = 300        # Close a stream after this long; the browser reconnects
+    
+    # Response cache settings
+    RESPONSE_CACHE_MAX_ENTRIES = 512      # Least recently used entries are evicted beyond this
+    RESPONSE_CACHE_TTL_SECONDS = 30       # Upper bound on how stale a cached view can be
+    COMPRESS_MIN_BYTES = 1024             # Compress responses larger than this (gzip, or br if available)
+    
+    # Chart settings
+    MAX_CHART_POINTS = 720            # Longer ranges are downsampled to about this many points
+    MAX_CHART_POINTS_LIMIT = 5000     # Upper bound for the points= API parameter
+    MAX_RECOVERY_SECONDS = 6 * 3600   # Door closes not recovered within this long count as never recovered
+    
+    # Hardware simulator settings (used when not running on a Raspberry Pi)
+    SIMULATOR_TIME_SCALE = float(os.environ.get('SIMULATOR_TIME_SCALE', '1'))  # Simulated seconds per real second
+    SIMULATOR_SENSOR_LATENCY_SECONDS = float(os.environ.get('SIMULATOR_SENSOR_LATENCY_SECONDS', '0'))  # Mean DHT22 read time
+    SIMULATOR_FAILURE_RATE = float(os.environ.get('SIMULATOR_FAILURE_RATE', '0'))  # Fraction of DHT22 reads that fail
+    SIMULATOR_DOOR_EVENTS_PER_HOUR = float(os.environ.get('SIMULATOR_DOOR_EVENTS_PER_HOUR', '0'))  # Random openings per fridge (0 = off)
+    SIMULATOR_DOOR_OPEN_SECONDS = 20      # Mean time a randomly opened door stays open
+    SIMULATOR_AMBIENT_TEMP = 22.0         # Room temperature the fridges leak heat towards
+    SIMULATOR_SEED = os.environ.get('SIMULATOR_SEED')  # Fix the random sequence for repeatable runs
     
     # Hardware pin defaults (BCM mode)
     DEFAULT_BUZZER_PIN = 27    # Default buzzer pin (changed from 17 to avoid conflict)
@@ -33,3 +78,14 @@ class Config:
     TEMP_DATA_RETENTION_DAYS = 30     # Keep temperature data for 30 days
     DOOR_EVENT_RETENTION_DAYS = 60    # Keep door events for 60 days
     ALERT_RETENTION_DAYS = 90         # Keep acknowledged alerts for 90 days
+    RETENTION_BATCH_SIZE = 5000       # Rows deleted per transaction during cleanup
+    RETENTION_BATCH_PAUSE_SECONDS = 0.05  # Pause between batches so other writers get the database
+    RETENTION_DROP_PARTITIONS = False # Drop whole expired partitions first (PostgreSQL range partitions only)
+    
+    # Rollup settings: bucket size in seconds -> days to keep (None = forever)
+    ROLLUP_RETENTION_DAYS = {
+        60: 30,        # 1-minute buckets
+        900: 365,      # 15-minute buckets
+        3600: 730,     # Hourly buckets
+        86400: None    # Daily buckets
+    }
@@ -0,0 +1,101 @@
+"""
+Dashboard data service
+
+Collects the status of every fridge for the index page using a fixed number
+of set-based queries, independent of how many fridges are configured.
+"""
+import logging
+from collections import defaultdict
+
+from app import db
+from models import Fridge, DoorEvent, Alert
+from reading_cache import recent_readings
+from rollups import get_average_readings
+from utils import day_bounds, format_daily_stats, get_recovery_times
+
+logger = logging.getLogger(__name__)
+
+def get_latest_door_states(fridge_ids):
+    """Return fridge_id -> True if the most recent door event is an 'open'"""
+    row_number = db.func.row_number().over(
+        partition_by=DoorEvent.fridge_id,
+        order_by=DoorEvent.timestamp.desc()
+    ).label('row_number')
+    ranked = db.select(
+        DoorEvent.fridge_id,
+        DoorEvent.event_type,
+        row_number
+    ).where(DoorEvent.fridge_id.in_(fridge_ids)).subquery()
+    
+    rows = db.session.execute(
+        db.select(ranked.c.fridge_id, ranked.c.event_type).where(ranked.c.row_number == 1)
+    ).all()
+    
+    door_states = {fridge_id: False for fridge_id in fridge_ids}
+    door_states.update({fridge_id: event_type == 'open' for fridge_id, event_type in rows})
+    return door_states
+
+def get_active_alerts(fridge_ids):
+    """Return fridge_id -> unacknowledged alerts, newest first"""
+    alerts = Alert.query.filter(
+        Alert.fridge_id.in_(fridge_ids),
+        Alert.acknowledged == False
+    ).order_by(Alert.timestamp.desc()).all()
+    
+    active_alerts = defaultdict(list)
+    for alert in alerts:
+        active_alerts[alert.fridge_id].append(alert)
+    return active_alerts
+
+def get_daily_stats(fridge_ids):
+    """Return fridge_id -> daily statistics dict for all fridges at once"""
+    day_start, day_end = day_bounds()
+    
+    # Door openings per fridge
+    door_open_counts = dict(db.session.query(
+        DoorEvent.fridge_id,
+        db.func.count(DoorEvent.id)
+    ).filter(
+        DoorEvent.fridge_id.in_(fridge_ids),
+        DoorEvent.event_type == 'open',
+        DoorEvent.timestamp >= day_start,
+        DoorEvent.timestamp < day_end
+    ).group_by(DoorEvent.fridge_id).all())
+    
+    # Average temperature and humidity per fridge
+    averages = get_average_readings(fridge_ids, day_start, day_end)
+    
+    # Recovery time after each door close
+    recovery_times = get_recovery_times(fridge_ids, since=day_start, until=day_end)
+    
+    stats = {}
+    for fridge_id in fridge_ids:
+        avg_temp, avg_humidity = averages.get(fridge_id, (None, None))
+        stats[fridge_id] = format_daily_stats(
+            door_open_counts.get(fridge_id, 0),
+            avg_temp,
+            avg_humidity,
+            [seconds for _, seconds in recovery_times[fridge_id]]
+        )
+    return stats
+
+def get_dashboard_data():
+    """Build the per-fridge status list rendered by the index page"""
+    fridges = Fridge.query.all()
+    fridge_ids = [fridge.id for fridge in fridges]
+    if not fridge_ids:
+        return []
+    
+    recent_readings.preload(fridge_ids)
+    door_states = get_latest_door_states(fridge_ids)
+    active_alerts = get_active_alerts(fridge_ids)
+    daily_stats = get_daily_stats(fridge_ids)
+    
+    return [{
+        'fridge': fridge,
+        'current_reading': recent_readings.latest(fridge.id),
+        'stats': daily_stats[fridge.id],
+        'days_until_maintenance': fridge.days_until_maintenance(),
+        'active_alerts': active_alerts.get(fridge.id, []),
+        'door_open': door_states[fridge.id]
+    } for fridge in fridges]
@@ -0,0 +1,94 @@
+"""
+In-process event publisher for live updates
+
+The polling loop and door callback publish reading, door, compressor and
+alert changes here once; every connected browser receives them through a
+Server-Sent Events stream, so database load does not depend on the number
+of open pages.
+"""
+import json
+import queue
+import logging
+import threading
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """Bounded queue of formatted events for one client"""
+    def __init__(self, fridge_id=None, max_events=Config.EVENT_STREAM_QUEUE_SIZE):
+        self.fridge_id = fridge_id
+        self.queue = queue.Queue(maxsize=max_events)
+    
+    def wants(self, fridge_id):
+        return self.fridge_id is None or fridge_id is None or self.fridge_id == fridge_id
+    
+    def put(self, message):
+        """Queue a message, discarding the oldest one if the client is falling behind"""
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventBroker:
+    """Fans published events out to all subscriptions"""
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._next_id = 1
+    
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+    
+    def subscribe(self, fridge_id=None):
+        """Register a client; pass a fridge ID to receive only that fridge's events"""
+        subscription = Subscription(fridge_id)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+    
+    def publish(self, event_type, fridge_id, data):
+        """Send an event to every interested subscriber"""
+        if not self._subscriptions:
+            return
+        
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            subscriptions = list(self._subscriptions)
+        
+        payload = dict(data, fridge_id=fridge_id)
+        message = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(payload)}\n\n"
+        for subscription in subscriptions:
+            if subscription.wants(fridge_id):
+                subscription.put(message)
+
+def alert_payload(alert):
+    """Serializable representation of an Alert, matching /api/alerts"""
+    return {
+        'id': alert.id,
+        'type': alert.alert_type,
+        'message': alert.message,
+        'timestamp': alert.timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+# Broker shared by the whole process
+broker = EventBroker()
@@ -0,0 +1,94 @@
+"""
+Streaming audit export of readings, door events and alerts
+
+Rows are fetched in keyset-paged batches, each in its own short read
+transaction, and written to the response as they arrive. Memory use stays
+constant whatever the date range, and a slow download never holds a read
+transaction open that would block the polling loop's inserts.
+"""
+import io
+import csv
+import json
+import logging
+
+from app import db
+from models import TemperatureReading, DoorEvent, Alert
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the database (and written to the response) per chunk
+EXPORT_BATCH_SIZE = 2000
+
+# Exportable datasets: name -> (model, exported columns)
+DATASETS = {
+    'readings': (TemperatureReading, ('timestamp', 'temperature', 'humidity')),
+    'door_events': (DoorEvent, ('timestamp', 'event_type')),
+    'alerts': (Alert, ('timestamp', 'alert_type', 'message', 'acknowledged')),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def iter_rows(dataset, fridge_id, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield lists of row tuples for a dataset, oldest first, `batch_size` at a time"""
+    model, columns = DATASETS[dataset]
+    query = db.select(model.id, *(getattr(model, column) for column in columns)).where(model.fridge_id == fridge_id)
+    if start is not None:
+        query = query.where(model.timestamp >= start)
+    if end is not None:
+        query = query.where(model.timestamp < end)
+    query = query.order_by(model.timestamp.asc(), model.id.asc()).limit(batch_size)
+    
+    last = None
+    while True:
+        page = query
+        if last is not None:
+            # Continue after the last (timestamp, id) sent
+            last_timestamp, last_id = last
+            page = page.where(db.or_(
+                model.timestamp > last_timestamp,
+                db.and_(model.timestamp == last_timestamp, model.id > last_id)
+            ))
+        rows = db.session.execute(page).all()
+        # End the read transaction before the batch is sent to the client
+        db.session.commit()
+        if not rows:
+            return
+        last = (rows[-1][1], rows[-1][0])
+        yield [row[1:] for row in rows]
+        if len(rows) < batch_size:
+            return
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def stream_csv(dataset, batches):
+    """Yield CSV text, one chunk per batch, starting with a header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DATASETS[dataset][1])
+    yield buffer.getvalue()
+    
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_serialize(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+def stream_ndjson(dataset, batches):
+    """Yield newline-delimited JSON, one chunk per batch"""
+    columns = DATASETS[dataset][1]
+    for rows in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, (_serialize(value) for value in row)))) + '\n'
+            for row in rows
+        )
+
+def stream_export(dataset, fridge_id, export_format, start=None, end=None):
+    """Generator producing the whole export body in the requested format"""
+    batches = iter_rows(dataset, fridge_id, start, end)
+    if export_format == 'csv':
+        return stream_csv(dataset, batches)
+    return stream_ndjson(dataset, batches)
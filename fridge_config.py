@@ -0,0 +1,105 @@
+"""
+Immutable, versioned snapshot of the fridge configuration
+
+The polling loop, the pipeline stages and the GPIO callbacks read settings
+from `fridge_configs.current()` instead of querying the Fridge table. A
+snapshot is never modified; `refresh()` builds a new one from the database
+and swaps it in with a single reference assignment, so readers need no lock
+and a reader always sees one consistent version. Code that saves fridge
+settings calls `refresh()` after committing.
+"""
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+from clock import clock
+from models import Fridge
+
+logger = logging.getLogger(__name__)
+
+class FridgeSettings(namedtuple('FridgeSettings', [
+    'id', 'name', 'target_temp', 'min_temp_threshold', 'max_temp_threshold',
+    'door_open_alert_seconds', 'compressor_status', 'maintenance_interval_days',
+    'last_maintenance_date', 'poll_interval_seconds', 'adaptive_polling',
+    'dht22_pin', 'door_sensor_pin', 'relay_pin'
+])):
+    """Detached copy of one fridge's settings, safe to share between threads"""
+    __slots__ = ()
+
+    @classmethod
+    def from_model(cls, fridge):
+        return cls(**{field: getattr(fridge, field) for field in cls._fields})
+
+    def days_until_maintenance(self, now=None):
+        """Days until the next maintenance is due (same rule as Fridge.days_until_maintenance)"""
+        if not self.last_maintenance_date:
+            return 0
+
+        next_maintenance = self.last_maintenance_date.replace(
+            year=self.last_maintenance_date.year + (self.maintenance_interval_days // 365)
+        )
+        days_remaining = (next_maintenance - (now or clock.utcnow())).days
+        return max(0, days_remaining)
+
+class ConfigSnapshot:
+    """One immutable version of every fridge's settings"""
+    __slots__ = ('version', 'loaded_at', 'fridges')
+
+    def __init__(self, version, fridges):
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+        self.fridges = MappingProxyType({fridge.id: fridge for fridge in fridges})
+
+    def get(self, fridge_id):
+        return self.fridges.get(fridge_id)
+
+    def select(self, fridge_ids=None):
+        """Settings of the given fridges (all when None), in ID order"""
+        if fridge_ids is None:
+            return list(self.fridges.values())
+        return [self.fridges[fridge_id] for fridge_id in sorted(fridge_ids) if fridge_id in self.fridges]
+
+class FridgeConfigStore:
+    """Holds the current snapshot and notifies subscribers when it changes"""
+    def __init__(self):
+        self._snapshot = None
+        self._version = 0
+        self._listeners = []
+        self._refresh_lock = threading.Lock()
+
+    def current(self):
+        """The current snapshot; loaded from the database on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self):
+        """Reload the settings from the database and publish them as a new version"""
+        with self._refresh_lock:
+            fridges = [FridgeSettings.from_model(fridge) for fridge in Fridge.query.order_by(Fridge.id).all()]
+            self._version += 1
+            snapshot = ConfigSnapshot(self._version, fridges)
+            previous, self._snapshot = self._snapshot, snapshot
+            logger.debug(f"Loaded fridge configuration version {snapshot.version}")
+
+            for listener in list(self._listeners):
+                try:
+                    listener(snapshot, previous)
+                except Exception as e:
+                    logger.error(f"Error applying fridge configuration version {snapshot.version}: {e}")
+            return snapshot
+
+    def subscribe(self, listener):
+        """Call `listener(snapshot, previous)` after every refresh"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+# Configuration shared by the polling loop, pipeline and callbacks
+fridge_configs = FridgeConfigStore()
@@ -14,26 +14,38 @@ if is_raspberry_pi:
     import RPi.GPIO as GPIO
 else:
     # Use our simulator module when not on Raspberry Pi
-    from hardware_simulator import GPIO
+    from hardware_simulator import GPIO, simulated_state
 
 from app import db
 from models import Fridge
-from sensor_handlers import (
-    setup_door_sensor, setup_relay, read_door_sensor, 
-    door_callback, check_fridges
-)
+from polling import poll_scheduler
+from fridge_config import fridge_configs
+from hardware_registry import hardware_registry
+from sensor_handlers import check_fridges, DoorEventWorker, ingestion_pipeline
 
 logger = logging.getLogger(__name__)
 
+# Consumer persisting door edges queued by the GPIO callbacks
+door_event_worker = None
+
 def setup_hardware_monitoring(app, scheduler):
     """
     Initialize hardware monitoring for all fridges
     Sets up GPIO pins and registers event detection
     """
+    global door_event_worker
     try:
         # Setup GPIO
         GPIO.setmode(GPIO.BCM)
         
+        # Start persisting door edges before any callback can fire
+        if door_event_worker is None:
+            door_event_worker = DoorEventWorker(app)
+        door_event_worker.start()
+        
+        # Sensor polls are handed to the staged ingestion pipeline workers
+        ingestion_pipeline.start(app)
+        
         with app.app_context():
             # Get all fridges
             fridges = Fridge.query.all()
@@ -44,33 +56,21 @@ def setup_hardware_monitoring(app, scheduler):
                 create_default_fridges()
                 fridges = Fridge.query.all()
             
-            # Setup hardware for each fridge
-            for fridge in fridges:
-                # Setup door sensor with callback
-                setup_door_sensor(fridge.door_sensor_pin)
-                
-                # Add event detection for door sensor (both rising and falling edge)
-                GPIO.add_event_detect(
-                    fridge.door_sensor_pin, 
-                    GPIO.BOTH, 
-                    callback=lambda channel, fid=fridge.id: door_callback(channel, fid),
-                    bouncetime=300
-                )
-                
-                # Setup relay for compressor control
-                setup_relay(fridge.relay_pin)
-                
-                logger.info(f"Hardware setup complete for Fridge {fridge.name}")
+            # The simulator derives its virtual fridges from the same settings
+            if not is_raspberry_pi:
+                fridge_configs.subscribe(simulated_state.apply)
             
-            # Schedule regular checks (every 30 seconds)
-            scheduler.add_job(
-                check_fridges_wrapper,
-                'interval',
-                seconds=30,
-                args=[app],
-                id='check_fridges',
-                replace_existing=True
-            )
+            # Wire up door sensors and relays, rewired whenever the pins change
+            fridge_configs.subscribe(hardware_registry.apply)
+            
+            # Schedule regular checks, one adaptive polling job per fridge,
+            # kept in step with every new configuration version
+            poll_scheduler.attach(scheduler, check_fridges_wrapper, app)
+            fridge_configs.subscribe(sync_polling)
+            fridge_configs.refresh()
+            
+            if not is_raspberry_pi:
+                simulated_state.start_door_events()
             
             # Schedule daily cleanup job (remove old readings to save space)
             scheduler.add_job(
@@ -89,11 +89,15 @@ def setup_hardware_monitoring(app, scheduler):
         logger.error(f"Error setting up hardware monitoring: {e}")
         raise
 
-def check_fridges_wrapper(app):
+def sync_polling(snapshot, previous):
+    """Configuration listener keeping the polling jobs in step with the settings"""
+    poll_scheduler.sync(snapshot.select())
+
+def check_fridges_wrapper(app, fridge_id=None):
     """Wrapper function to provide app context for the scheduler"""
     with app.app_context():
         from sensor_handlers import check_fridges
-        check_fridges()
+        check_fridges(None if fridge_id is None else [fridge_id])
 
 def cleanup_old_data_wrapper(app):
     """Wrapper function to clean up old data with app context"""
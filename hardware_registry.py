@@ -0,0 +1,100 @@
+"""
+Registry of the GPIO channels wired to each fridge
+
+The registry subscribes to the fridge configuration snapshot. When a new
+version changes a fridge's pins, only the affected channels are rewired:
+door sensor edge detection is moved to the new pin, the compressor relay is
+switched off on the old pin and restored on the new one, and the DHT22
+channel is picked up by the next poll, which reads its pin from the same
+snapshot. The other fridges keep being monitored throughout.
+"""
+import logging
+import threading
+from collections import namedtuple
+
+import sensor_handlers
+from sensor_handlers import GPIO, setup_door_sensor, setup_relay, door_callback
+
+logger = logging.getLogger(__name__)
+
+Binding = namedtuple('Binding', ['dht22_pin', 'door_sensor_pin', 'relay_pin'])
+
+class HardwareRegistry:
+    """Attaches and detaches GPIO channels to match the fridge configuration"""
+    def __init__(self):
+        self._bindings = {}  # fridge_id -> Binding currently wired
+        self._lock = threading.Lock()
+
+    def bindings(self):
+        return dict(self._bindings)
+
+    def apply(self, snapshot, previous=None):
+        """Configuration listener: rewire the channels whose pins changed"""
+        with self._lock:
+            wanted = {
+                fridge.id: Binding(fridge.dht22_pin, fridge.door_sensor_pin, fridge.relay_pin)
+                for fridge in snapshot.select()
+            }
+
+            # Release every channel that is going away first, so a pin moving
+            # from one fridge to another is free before it is attached again
+            for fridge_id, binding in self._bindings.items():
+                new = wanted.get(fridge_id)
+                if new is None or new.door_sensor_pin != binding.door_sensor_pin:
+                    self._detach_door_sensor(fridge_id, binding.door_sensor_pin)
+                if new is None or new.relay_pin != binding.relay_pin:
+                    self._detach_relay(fridge_id, binding.relay_pin)
+                if new is not None and new.dht22_pin != binding.dht22_pin:
+                    logger.info(f"Fridge {fridge_id} DHT22 sensor moved from pin {binding.dht22_pin} to {new.dht22_pin}")
+
+            for fridge_id, new in wanted.items():
+                binding = self._bindings.get(fridge_id)
+                if binding is None or new.door_sensor_pin != binding.door_sensor_pin:
+                    self._attach_door_sensor(fridge_id, new.door_sensor_pin, resync=binding is not None)
+                if binding is None or new.relay_pin != binding.relay_pin:
+                    self._attach_relay(snapshot.get(fridge_id), new.relay_pin)
+
+            self._bindings = wanted
+
+    def _attach_door_sensor(self, fridge_id, pin, resync):
+        try:
+            setup_door_sensor(pin)
+
+            # Add event detection for door sensor (both rising and falling edge)
+            GPIO.add_event_detect(
+                pin,
+                GPIO.BOTH,
+                callback=lambda channel, fid=fridge_id: door_callback(channel, fid),
+                bouncetime=300
+            )
+            if resync:
+                # Edges may have been missed while switching; queue the current state
+                door_callback(pin, fridge_id)
+            logger.info(f"Door sensor of fridge {fridge_id} attached on pin {pin}")
+        except Exception as e:
+            logger.error(f"Error attaching door sensor of fridge {fridge_id} on pin {pin}: {e}")
+
+    def _detach_door_sensor(self, fridge_id, pin):
+        try:
+            GPIO.remove_event_detect(pin)
+            logger.info(f"Door sensor of fridge {fridge_id} detached from pin {pin}")
+        except Exception as e:
+            logger.error(f"Error detaching door sensor of fridge {fridge_id} from pin {pin}: {e}")
+
+    def _attach_relay(self, fridge, pin):
+        try:
+            # Setup relay for compressor control, then restore the compressor state
+            setup_relay(pin)
+            sensor_handlers.actuators.reset_relay(pin)
+            sensor_handlers.actuators.set_relay(pin, sensor_handlers.compressor_states.get(fridge.id, fridge.compressor_status))
+            logger.info(f"Compressor relay of fridge {fridge.id} attached on pin {pin}")
+        except Exception as e:
+            logger.error(f"Error attaching compressor relay of fridge {fridge.id} on pin {pin}: {e}")
+
+    def _detach_relay(self, fridge_id, pin):
+        # Leave the old channel switched off
+        sensor_handlers.actuators.set_relay(pin, False)
+        logger.info(f"Compressor relay of fridge {fridge_id} detached from pin {pin}")
+
+# GPIO wiring of all fridges
+hardware_registry = HardwareRegistry()
@@ -1,12 +1,23 @@
 """
 Hardware simulator for the Fridge Monitor system
 Used when running on non-Raspberry Pi hardware
+
+Every configured fridge becomes a virtual unit found through its DHT22, door
+sensor and relay pins. Units follow a simple thermal model (heat leaking in
+from the room, faster with the door open, removed by the compressor) that is
+evaluated in closed form whenever a unit is touched, so thousands of units
+cost nothing while idle. The simulation clock can run faster than real time,
+and sensor latency, read failures and random door openings are configurable.
 """
+import math
 import time
+import heapq
 import random
 import logging
-import sys
-from datetime import datetime
+import threading
+from collections import namedtuple
+
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -25,81 +36,258 @@ class GPIO:
     BOTH = "BOTH"
     PUD_UP = "PUD_UP"
     PUD_DOWN = "PUD_DOWN"
-    
+
+    # Edge callbacks registered per pin
+    event_callbacks = {}
+
     @staticmethod
     def setmode(mode):
         """Simulate GPIO.setmode"""
         logger.debug(f"Simulated GPIO.setmode({mode})")
         pass
-    
+
     @staticmethod
     def setwarnings(flag):
         """Simulate GPIO.setwarnings"""
         logger.debug(f"Simulated GPIO.setwarnings({flag})")
         pass
-    
+
     @staticmethod
     def setup(pin, mode, pull_up_down=None):
         """Simulate GPIO.setup"""
         logger.debug(f"Simulated GPIO.setup(pin={pin}, mode={mode})")
         pass
-    
+
     @staticmethod
     def input(pin):
         """Simulate GPIO.input"""
-        # This will be replaced by read_door_sensor for our use case
-        pass
-    
+        return GPIO.HIGH if read_door_sensor(pin) else GPIO.LOW
+
     @staticmethod
     def output(pin, state):
         """Simulate GPIO.output"""
-        # This will be replaced by set_relay_state for our use case
-        pass
-    
+        if simulated_state.unit_for_relay(pin) is not None:
+            set_relay_state(pin, state == GPIO.HIGH)
+
     @staticmethod
     def add_event_detect(pin, edge, callback=None, bouncetime=None):
         """Simulate GPIO.add_event_detect"""
         logger.debug(f"Simulated GPIO.add_event_detect for pin {pin}")
-        pass
+        if pin in GPIO.event_callbacks:
+            raise RuntimeError(f"Conflicting edge detection already enabled for this GPIO channel ({pin})")
+        GPIO.event_callbacks[pin] = callback
+
+    @staticmethod
+    def remove_event_detect(pin):
+        """Simulate GPIO.remove_event_detect"""
+        logger.debug(f"Simulated GPIO.remove_event_detect for pin {pin}")
+        GPIO.event_callbacks.pop(pin, None)
+
+class SimulationClock:
+    """Simulated seconds, running `time_scale` times faster than real time"""
+    def __init__(self, time_scale=Config.SIMULATOR_TIME_SCALE):
+        self.time_scale = time_scale
+        self._origin = time.monotonic()
+        self._offset = 0.0
+
+    def now(self):
+        return (time.monotonic() - self._origin) * self.time_scale + self._offset
+
+    def advance(self, seconds):
+        """Jump the simulation forward without waiting"""
+        self._offset += seconds
+
+    def real_seconds(self, simulated_seconds):
+        """Wall-clock time corresponding to a simulated duration"""
+        return simulated_seconds / self.time_scale if self.time_scale > 0 else simulated_seconds
+
+# Heat transfer constants are per second; cooling_rate is in °C per second
+ThermalModel = namedtuple('ThermalModel', [
+    'ambient_temp', 'ambient_humidity', 'dry_humidity',
+    'insulation_k', 'door_open_k', 'cooling_rate', 'humidity_k', 'sensor_noise'
+])
+
+def thermal_model_for(target_temp, ambient_temp=Config.SIMULATOR_AMBIENT_TEMP):
+    """Default model for a fridge held at `target_temp`, with the compressor running about a third of the time"""
+    insulation_k = 0.0005
+    return ThermalModel(
+        ambient_temp=ambient_temp,
+        ambient_humidity=60.0,
+        dry_humidity=45.0 if target_temp > 0 else 30.0,
+        insulation_k=insulation_k,
+        door_open_k=0.01,
+        cooling_rate=3 * insulation_k * max(ambient_temp - target_temp, 1.0),
+        humidity_k=0.005,
+        sensor_noise=0.1
+    )
+
+class VirtualFridge:
+    """State of one simulated unit"""
+    __slots__ = ('fridge_id', 'model', 'temperature', 'humidity', 'door_open',
+                 'compressor_on', 'updated_at')
+
+    def __init__(self, fridge_id, model, temperature, humidity, now):
+        self.fridge_id = fridge_id
+        self.model = model
+        self.temperature = temperature
+        self.humidity = humidity
+        self.door_open = False
+        self.compressor_on = False
+        self.updated_at = now
+
+    def advance(self, now):
+        """Bring temperature and humidity forward to simulated time `now`"""
+        elapsed = now - self.updated_at
+        if elapsed <= 0:
+            return
+        model = self.model
+
+        # Newton cooling towards the equilibrium set by the leak and the compressor
+        k = model.door_open_k if self.door_open else model.insulation_k
+        cooling = model.cooling_rate if self.compressor_on else 0.0
+        equilibrium = model.ambient_temp - cooling / k
+        self.temperature = equilibrium + (self.temperature - equilibrium) * math.exp(-k * elapsed)
+
+        target_humidity = model.ambient_humidity if self.door_open else model.dry_humidity
+        self.humidity = target_humidity + (self.humidity - target_humidity) * math.exp(-model.humidity_k * elapsed)
+        self.updated_at = now
 
-# Simulated hardware state
 class SimulatedHardwareState:
     """Class to maintain state for simulated hardware"""
-    def __init__(self):
-        # Default temperature and humidity for fridges
-        self.temperatures = {
-            # fridge_id: (temperature, humidity)
-            1: (4.5, 45.0),  # Main refrigerator
-            2: (-18.2, 30.0)  # Freezer
-        }
-        
-        # Door states (True = open, False = closed)
-        self.door_states = {
-            1: False,  # Main refrigerator door closed
-            2: False   # Freezer door closed
-        }
-        
-        # Compressor states (True = on, False = off)
-        self.compressor_states = {
-            1: False,  # Main refrigerator compressor off
-            2: False   # Freezer compressor off
-        }
-        
-        # Time when doors were last opened
-        self.door_open_times = {}
-        
-        # Start simulation with some random fluctuations
-        self._start_simulation()
-        
-    def _start_simulation(self):
-        """Initialize with some random variations"""
-        # Slightly randomize initial temperatures
-        for fridge_id in self.temperatures:
-            temp, humidity = self.temperatures[fridge_id]
-            # Add small random variation
-            temp += random.uniform(-0.5, 0.5)
-            humidity += random.uniform(-5, 5)
-            self.temperatures[fridge_id] = (temp, humidity)
+    def __init__(self, clock=None, latency=Config.SIMULATOR_SENSOR_LATENCY_SECONDS,
+                 failure_rate=Config.SIMULATOR_FAILURE_RATE,
+                 door_events_per_hour=Config.SIMULATOR_DOOR_EVENTS_PER_HOUR,
+                 door_open_seconds=Config.SIMULATOR_DOOR_OPEN_SECONDS,
+                 seed=Config.SIMULATOR_SEED):
+        self.clock = clock or SimulationClock()
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.door_events_per_hour = door_events_per_hour
+        self.door_open_seconds = door_open_seconds
+        self.random = random.Random(seed)
+        self.units = {}            # fridge_id -> VirtualFridge
+        self._dht22_pins = {}      # pin -> fridge_id
+        self._door_pins = {}
+        self._relay_pins = {}
+        self.buzzer_on = False
+        self._lock = threading.RLock()
+        self._door_schedule = []   # heap of (simulated time, fridge_id)
+        self._door_thread = None
+        self._stop = threading.Event()
+
+    def apply(self, snapshot, previous=None):
+        """Configuration listener: create, move or remove units to match the fridges"""
+        self.sync(snapshot.select())
+
+    def sync(self, fridges):
+        """Derive the virtual units and pin map from fridge settings"""
+        now = self.clock.now()
+        with self._lock:
+            units = {}
+            for fridge in fridges:
+                unit = self.units.get(fridge.id)
+                if unit is None:
+                    model = thermal_model_for(fridge.target_temp)
+                    unit = VirtualFridge(
+                        fridge.id, model,
+                        fridge.target_temp + self.random.uniform(-0.5, 0.5),
+                        model.dry_humidity + self.random.uniform(-5, 5),
+                        now
+                    )
+                    self._schedule_door_event(unit, now)
+                units[fridge.id] = unit
+            self.units = units
+            self._dht22_pins = {fridge.dht22_pin: fridge.id for fridge in fridges}
+            self._door_pins = {fridge.door_sensor_pin: fridge.id for fridge in fridges}
+            self._relay_pins = {fridge.relay_pin: fridge.id for fridge in fridges}
+        logger.debug(f"Simulating {len(self.units)} fridges")
+
+    def unit_for_dht22(self, pin):
+        return self.units.get(self._dht22_pins.get(pin))
+
+    def unit_for_door(self, pin):
+        return self.units.get(self._door_pins.get(pin))
+
+    def unit_for_relay(self, pin):
+        return self.units.get(self._relay_pins.get(pin))
+
+    def door_pin(self, fridge_id):
+        for pin, unit_id in self._door_pins.items():
+            if unit_id == fridge_id:
+                return pin
+        return None
+
+    def set_door(self, fridge_id, is_open):
+        """Open or close a unit's door and fire the edge callback of its door pin"""
+        with self._lock:
+            unit = self.units.get(fridge_id)
+            if unit is None or unit.door_open == is_open:
+                return False
+            unit.advance(self.clock.now())
+            unit.door_open = is_open
+            pin = self.door_pin(fridge_id)
+
+        callback = GPIO.event_callbacks.get(pin)
+        if callback is not None:
+            logger.debug(f"Triggering door callback for fridge {fridge_id}, door {'open' if is_open else 'closed'}")
+            callback(pin)
+        return True
+
+    def _schedule_door_event(self, unit, now):
+        # Called with the lock held
+        if self.door_events_per_hour <= 0:
+            return
+        if unit.door_open:
+            delay = self.random.expovariate(1.0 / self.door_open_seconds)
+        else:
+            delay = self.random.expovariate(self.door_events_per_hour / 3600.0)
+        heapq.heappush(self._door_schedule, (now + delay, unit.fridge_id))
+
+    def start_door_events(self):
+        """Start opening and closing doors at random, if a door event rate is configured"""
+        if self.door_events_per_hour <= 0 or (self._door_thread and self._door_thread.is_alive()):
+            return
+        self._stop.clear()
+        self._door_thread = threading.Thread(target=self._run_door_events, name='simulated-doors', daemon=True)
+        self._door_thread.start()
+
+    def stop_door_events(self):
+        self._stop.set()
+        if self._door_thread is not None:
+            self._door_thread.join()
+            self._door_thread = None
+
+    @property
+    def door_events_running(self):
+        return self._door_thread is not None and self._door_thread.is_alive()
+
+    def run_door_events(self, until):
+        """Fire every random door event due up to simulated time `until`; returns how many fired"""
+        fired = 0
+        while True:
+            with self._lock:
+                if not self._door_schedule or self._door_schedule[0][0] > until:
+                    return fired
+                _, fridge_id = heapq.heappop(self._door_schedule)
+                unit = self.units.get(fridge_id)
+                if unit is None:
+                    continue
+                is_open = not unit.door_open
+
+            self.set_door(fridge_id, is_open)
+            with self._lock:
+                self._schedule_door_event(unit, self.clock.now())
+            fired += 1
+
+    def _run_door_events(self):
+        while not self._stop.is_set():
+            self.run_door_events(self.clock.now())
+            with self._lock:
+                next_due = self._door_schedule[0][0] if self._door_schedule else None
+            wait = 1.0
+            if next_due is not None:
+                wait = min(wait, max(0.0, self.clock.real_seconds(next_due - self.clock.now())))
+            self._stop.wait(wait)
 
 # Create a single instance to maintain state
 simulated_state = SimulatedHardwareState()
@@ -107,32 +295,25 @@ simulated_state = SimulatedHardwareState()
 # Simulated DHT22
 def read_dht22(pin):
     """Simulate reading temperature and humidity from DHT22 sensor"""
-    # Determine which fridge based on pin
-    fridge_id = 1 if pin == 4 else 2
-    
-    # Get current simulated temperature and humidity
-    temp, humidity = simulated_state.temperatures[fridge_id]
-    
-    # Add small random fluctuations to simulate sensor readings
-    temp += random.uniform(-0.2, 0.2)
-    humidity += random.uniform(-1, 1)
-    
-    # Update stored values
-    simulated_state.temperatures[fridge_id] = (temp, humidity)
-    
-    # Simulate compressor effect - if compressor is on, temperature should decrease
-    if simulated_state.compressor_states[fridge_id]:
-        cooling_effect = random.uniform(0.1, 0.3)
-        new_temp = temp - cooling_effect
-        simulated_state.temperatures[fridge_id] = (new_temp, humidity)
-    
-    # If door is open, temperature should increase
-    if simulated_state.door_states[fridge_id]:
-        warming_effect = random.uniform(0.1, 0.3)
-        new_temp = temp + warming_effect
-        simulated_state.temperatures[fridge_id] = (new_temp, humidity)
-    
-    logger.debug(f"Simulated DHT22 reading for fridge {fridge_id}: {temp:.1f}°C, {humidity:.1f}%")
+    state = simulated_state
+    if state.latency > 0:
+        # A DHT22 transfer takes a variable amount of time
+        time.sleep(state.clock.real_seconds(state.random.uniform(0.5, 1.5) * state.latency))
+
+    with state._lock:
+        unit = state.unit_for_dht22(pin)
+        if unit is None:
+            logger.error(f"Failed to read from DHT22 sensor on pin {pin}")
+            return None, None
+        if state.failure_rate and state.random.random() < state.failure_rate:
+            logger.error(f"Failed to read from DHT22 sensor on pin {pin}")
+            return None, None
+
+        unit.advance(state.clock.now())
+        temp = unit.temperature + state.random.gauss(0, unit.model.sensor_noise)
+        humidity = min(100.0, max(0.0, unit.humidity + state.random.gauss(0, 1.0)))
+
+    logger.debug(f"Simulated DHT22 reading for fridge {unit.fridge_id}: {temp:.1f}°C, {humidity:.1f}%")
     return temp, humidity
 
 # Simulated door sensor
@@ -143,11 +324,10 @@ def setup_door_sensor(pin):
 
 def read_door_sensor(pin):
     """Simulate reading door sensor state"""
-    # Determine which fridge based on pin
-    fridge_id = 1 if pin == 17 else 2
-    
+    unit = simulated_state.unit_for_door(pin)
+
     # Return current door state
-    return simulated_state.door_states[fridge_id]
+    return unit.door_open if unit is not None else False
 
 # Simulated relay
 def setup_relay(pin):
@@ -157,45 +337,33 @@ def setup_relay(pin):
 
 def set_relay_state(pin, state):
     """Simulate setting relay state"""
-    # Determine which fridge based on pin
-    fridge_id = 1 if pin == 18 else 2
-    
-    # Update compressor state
-    simulated_state.compressor_states[fridge_id] = state
-    
-    logger.debug(f"Simulated relay for fridge {fridge_id} set to {'ON' if state else 'OFF'}")
+    with simulated_state._lock:
+        unit = simulated_state.unit_for_relay(pin)
+        if unit is None:
+            logger.debug(f"Simulated relay on unused pin {pin} set to {'ON' if state else 'OFF'}")
+            return True
+
+        # Update compressor state
+        unit.advance(simulated_state.clock.now())
+        unit.compressor_on = state
+
+    logger.debug(f"Simulated relay for fridge {unit.fridge_id} set to {'ON' if state else 'OFF'}")
     return True
 
 # Simulated buzzer
-def activate_buzzer(duration=1.0):
-    """Simulate activating buzzer"""
-    logger.debug(f"Simulated buzzer activated for {duration} seconds")
-    pass
-
-# These functions are now implemented in the GPIO class above
+def set_buzzer_state(state):
+    """Simulate switching the buzzer on or off"""
+    simulated_state.buzzer_on = state
+    logger.debug(f"Simulated buzzer {'ON' if state else 'OFF'}")
+    return True
 
 # Function to simulate door events
 def simulate_door_event(fridge_id, event_type):
     """
     Simulate a door open/close event
-    
+
     Args:
-        fridge_id: The ID of the fridge (1 or 2)
+        fridge_id: The ID of the fridge
         event_type: Either 'open' or 'close'
     """
-    pin = 17 if fridge_id == 1 else 23  # Door sensor pins
-    
-    if event_type == 'open':
-        simulated_state.door_states[fridge_id] = True
-        simulated_state.door_open_times[fridge_id] = datetime.utcnow()
-    else:  # close
-        simulated_state.door_states[fridge_id] = False
-        if fridge_id in simulated_state.door_open_times:
-            del simulated_state.door_open_times[fridge_id]
-    
-    # Find the callback in the sys.modules and call it
-    # This is a bit of a hack, but it allows us to trigger the door events
-    from sys import modules
-    if hasattr(modules['sensor_handlers'], 'door_callback'):
-        logger.debug(f"Triggering door callback for fridge {fridge_id}, event {event_type}")
-        modules['sensor_handlers'].door_callback(pin, fridge_id)
\ No newline at end of file
+    return simulated_state.set_door(fridge_id, event_type == 'open')
@@ -0,0 +1,77 @@
+"""
+Batched ingestion of temperature readings
+
+Readings are accumulated in memory and written with a single multi-row
+INSERT instead of one ORM object per reading.
+"""
+import logging
+import threading
+
+from config import Config
+from clock import clock
+from app import db
+from models import TemperatureReading
+from rollups import apply_readings
+
+logger = logging.getLogger(__name__)
+
+class ReadingBuffer:
+    """In-memory buffer of temperature readings waiting to be written"""
+    def __init__(self, batch_size=Config.READING_BATCH_SIZE,
+                 flush_interval=Config.READING_FLUSH_INTERVAL_SECONDS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._last_flush = clock.utcnow()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def add(self, fridge_id, temperature, humidity, timestamp=None):
+        """Queue a reading for the next flush"""
+        with self._lock:
+            self._rows.append({
+                'fridge_id': fridge_id,
+                'temperature': temperature,
+                'humidity': humidity,
+                'timestamp': timestamp or clock.utcnow()
+            })
+    
+    def should_flush(self):
+        """Whether the size or age threshold has been reached"""
+        if not self._rows:
+            return False
+        if len(self._rows) >= self.batch_size:
+            return True
+        return (clock.utcnow() - self._last_flush).total_seconds() >= self.flush_interval
+    
+    def flush(self):
+        """
+        Write all buffered readings with one executemany INSERT and fold
+        them into the rollup buckets
+        
+        The insert runs in the current session; the caller is responsible for
+        committing. Returns the number of rows written.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+        
+        if not rows:
+            return 0
+        
+        try:
+            db.session.execute(TemperatureReading.__table__.insert(), rows)
+            apply_readings(rows)
+        except Exception:
+            # Put the rows back so they are retried on the next flush
+            with self._lock:
+                self._rows[:0] = rows
+            raise
+        
+        self._last_flush = clock.utcnow()
+        logger.debug(f"Flushed {len(rows)} temperature readings")
+        return len(rows)
+
+# Buffer shared by the polling loop
+reading_buffer = ReadingBuffer()
@@ -86,7 +86,7 @@ After=network.target
 [Service]
 User=pi
 WorkingDirectory=$APP_DIR
-ExecStart=/usr/local/bin/gunicorn --bind 0.0.0.0:5000 --reuse-port main:app
+ExecStart=/usr/local/bin/gunicorn -k gthread --threads 8 --bind 0.0.0.0:5000 --reuse-port main:app
 Restart=always
 
 [Install]
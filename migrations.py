@@ -0,0 +1,73 @@
+"""
+Lightweight schema migrations for existing databases
+
+`db.create_all()` only creates missing tables, so columns and indexes added
+to models after a database was first created never reach it, and new derived
+tables start out empty. `upgrade_schema()` fills those gaps and is safe to run on
+every start.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+def ensure_columns():
+    """Add any column declared on the models that is missing in the database"""
+    inspector = inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    added = 0
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            logger.info(f"Adding column {column.name} to {table.name}")
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+                # Give existing rows the model default
+                if column.default is not None and column.default.is_scalar:
+                    connection.execute(table.update().values({column.name: column.default.arg}))
+            added += 1
+    return added
+
+def ensure_indexes():
+    """Create any index declared on the models that is missing in the database"""
+    inspector = inspect(db.engine)
+    created = 0
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logger.info(f"Creating index {index.name} on {table.name}")
+                index.create(bind=db.engine)
+                created += 1
+    return created
+
+def backfill_rollups():
+    """Build rollups from raw readings for databases created before rollups existed"""
+    from models import TemperatureReading, ReadingRollup
+    from rollups import rebuild_rollups
+    
+    if ReadingRollup.query.first() is None and TemperatureReading.query.first() is not None:
+        logger.info("Backfilling reading rollups from raw readings")
+        rebuild_rollups()
+
+def upgrade_schema():
+    """Bring an existing database up to date with the models"""
+    try:
+        ensure_columns()
+        ensure_indexes()
+        backfill_rollups()
+    except Exception as e:
+        logger.error(f"Error upgrading database schema: {e}")
+        raise
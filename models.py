@@ -1,5 +1,6 @@
 from datetime import datetime
 from app import db
+from reading_cache import recent_readings
 
 class Fridge(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -12,6 +13,8 @@ class Fridge(db.Model):
     compressor_status = db.Column(db.Boolean, default=False)
     maintenance_interval_days = db.Column(db.Integer, default=365)  # Annual maintenance by default
     last_maintenance_date = db.Column(db.DateTime, default=datetime.utcnow)
+    poll_interval_seconds = db.Column(db.Integer, default=30)  # Base sensor sampling interval
+    adaptive_polling = db.Column(db.Boolean, default=True)  # Sample faster after door events and excursions
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Hardware configuration
@@ -24,17 +27,21 @@ class Fridge(db.Model):
     door_events = db.relationship('DoorEvent', backref='fridge', lazy=True, cascade="all, delete-orphan")
     maintenance_records = db.relationship('MaintenanceRecord', backref='fridge', lazy=True, cascade="all, delete-orphan")
     alerts = db.relationship('Alert', backref='fridge', lazy=True, cascade="all, delete-orphan")
+    rollups = db.relationship('ReadingRollup', backref='fridge', lazy=True, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Fridge {self.name}>'
     
     def get_today_door_openings(self):
         """Return count of door openings for today"""
-        today = datetime.utcnow().date()
+        from utils import day_bounds
+        
+        day_start, day_end = day_bounds()
         return DoorEvent.query.filter(
             DoorEvent.fridge_id == self.id,
             DoorEvent.event_type == 'open',
-            db.func.date(DoorEvent.timestamp) == today
+            DoorEvent.timestamp >= day_start,
+            DoorEvent.timestamp < day_end
         ).count()
     
     def is_door_open(self):
@@ -48,35 +55,19 @@ class Fridge(db.Model):
         return False
     
     def get_current_reading(self):
-        """Get the most recent temperature reading"""
-        return TemperatureReading.query.filter_by(
-            fridge_id=self.id
-        ).order_by(TemperatureReading.timestamp.desc()).first()
+        """Get the most recent temperature reading (served from the in-memory buffer)"""
+        return recent_readings.latest(self.id)
     
     def get_last_recovery_time(self):
         """Calculate the most recent recovery time (time to reach target temp after door close)"""
-        # Find the most recent door close event
-        last_door_close = DoorEvent.query.filter_by(
-            fridge_id=self.id, 
-            event_type='close'
-        ).order_by(DoorEvent.timestamp.desc()).first()
+        from utils import get_recovery_times
         
-        if not last_door_close:
+        recovery_times = get_recovery_times([self.id], last_only=True)[self.id]
+        if not recovery_times:
             return None
         
-        # Find the next temperature reading at or below target after door close
-        recovery_reading = TemperatureReading.query.filter(
-            TemperatureReading.fridge_id == self.id,
-            TemperatureReading.temperature <= self.target_temp,
-            TemperatureReading.timestamp > last_door_close.timestamp
-        ).order_by(TemperatureReading.timestamp.asc()).first()
-        
-        if not recovery_reading:
-            return None
-            
-        # Calculate recovery time in seconds
-        recovery_time = (recovery_reading.timestamp - last_door_close.timestamp).total_seconds()
-        return recovery_time
+        # Recovery time in seconds
+        return recovery_times[-1][1]
     
     def days_until_maintenance(self):
         """Calculate days until next maintenance is due"""
@@ -93,6 +84,11 @@ class Fridge(db.Model):
 
 
 class TemperatureReading(db.Model):
+    __table_args__ = (
+        db.Index('ix_temperature_reading_fridge_timestamp', 'fridge_id', 'timestamp'),
+        db.Index('ix_temperature_reading_timestamp', 'timestamp'),  # retention cleanup
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     fridge_id = db.Column(db.Integer, db.ForeignKey('fridge.id'), nullable=False)
     temperature = db.Column(db.Float, nullable=False)
@@ -103,7 +99,36 @@ class TemperatureReading(db.Model):
         return f'<TemperatureReading {self.temperature}°C, {self.humidity}% at {self.timestamp}>'
 
 
+class ReadingRollup(db.Model):
+    """Pre-aggregated temperature/humidity statistics for one fridge and time bucket"""
+    __table_args__ = (
+        db.UniqueConstraint('fridge_id', 'resolution', 'bucket_start', name='uq_reading_rollup_bucket'),
+        db.Index('ix_reading_rollup_resolution_bucket', 'resolution', 'bucket_start'),  # retention cleanup
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fridge_id = db.Column(db.Integer, db.ForeignKey('fridge.id'), nullable=False)
+    resolution = db.Column(db.Integer, nullable=False)  # Bucket size in seconds
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_sum = db.Column(db.Float, nullable=False, default=0.0)
+    temperature_min = db.Column(db.Float, nullable=False)
+    temperature_max = db.Column(db.Float, nullable=False)
+    humidity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    humidity_min = db.Column(db.Float, nullable=False)
+    humidity_max = db.Column(db.Float, nullable=False)
+    
+    def __repr__(self):
+        return f'<ReadingRollup {self.resolution}s at {self.bucket_start}: {self.count} readings>'
+
+
 class DoorEvent(db.Model):
+    __table_args__ = (
+        db.Index('ix_door_event_fridge_timestamp', 'fridge_id', 'timestamp'),
+        db.Index('ix_door_event_fridge_type_timestamp', 'fridge_id', 'event_type', 'timestamp'),
+        db.Index('ix_door_event_timestamp', 'timestamp'),  # retention cleanup
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     fridge_id = db.Column(db.Integer, db.ForeignKey('fridge.id'), nullable=False)
     event_type = db.Column(db.String(10), nullable=False)  # 'open' or 'close'
@@ -125,6 +150,12 @@ class MaintenanceRecord(db.Model):
 
 
 class Alert(db.Model):
+    __table_args__ = (
+        db.Index('ix_alert_fridge_timestamp', 'fridge_id', 'timestamp'),
+        db.Index('ix_alert_fridge_acknowledged_timestamp', 'fridge_id', 'acknowledged', 'timestamp'),
+        db.Index('ix_alert_acknowledged_timestamp', 'acknowledged', 'timestamp'),  # retention cleanup
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     fridge_id = db.Column(db.Integer, db.ForeignKey('fridge.id'), nullable=False)
     alert_type = db.Column(db.String(32), nullable=False)  # 'door_open', 'temp_high', 'temp_low', 'maintenance_due', 'defrosting'
@@ -0,0 +1,275 @@
+"""
+Staged processing pipeline with per-stage latency histograms
+
+A pipeline is a chain of stages. Each stage has a bounded queue, its own
+worker threads and an overflow policy, so a slow stage only backs up its own
+queue instead of stalling the stages before it. The same chain can also be
+run synchronously with `Pipeline.run`, which is what the scheduler falls back
+to when the workers have not been started.
+"""
+import time
+import queue
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets in milliseconds; the last bucket is open
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket histogram of durations"""
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+
+    def observe(self, seconds):
+        """Record one duration given in seconds"""
+        ms = seconds * 1000.0
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentile(self, fraction):
+        """Upper bound in milliseconds of the bucket holding the given fraction of samples"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = fraction * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank:
+                    return self.bounds[index] if index < len(self.bounds) else self.max_ms
+            return self.max_ms
+
+    def snapshot(self):
+        """Counters and approximate percentiles as a JSON-serialisable dict"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'buckets': {
+                (f"le_{bound}" if index < len(self.bounds) else 'inf'): self.counts[index]
+                for index, bound in enumerate(self.bounds + (None,))
+            }
+        }
+
+class Stage:
+    """
+    One pipeline step: a bounded queue drained by worker threads
+
+    `handler` receives a list of items and returns the list of items to hand to
+    the next stage (or None). Overflow policies when the queue is full:
+    'block' waits for room (backpressure), 'drop_oldest' discards the oldest
+    queued item and 'drop_newest' discards the item being added.
+
+    With a `sheddable(item)` predicate, 'drop_oldest' only ever discards items
+    it accepts: the oldest sheddable queued item goes first, then a sheddable
+    new item, and an item that must not be lost waits for room instead.
+    """
+    def __init__(self, name, handler, maxsize=100, workers=1, batch_size=1, overflow='block', sheddable=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.sheddable = sheddable
+        self.queue = queue.Queue(maxsize)
+        self.downstream = None
+        self.dropped = 0
+        self.blocked = 0
+        self.errors = 0
+        self.wait_latency = LatencyHistogram()
+        self.service_latency = LatencyHistogram()
+        self._app = None
+        self._threads = []
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def put(self, item):
+        """Queue an item for the workers, applying the overflow policy"""
+        entry = (time.monotonic(), item)
+        if self.overflow == 'block':
+            self.queue.put(entry)
+            return True
+        if self.overflow == 'drop_newest':
+            try:
+                self.queue.put_nowait(entry)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                logger.warning(f"{self.name} stage queue full, dropping newest item")
+                return False
+        while True:
+            try:
+                self.queue.put_nowait(entry)
+                return True
+            except queue.Full:
+                if self.sheddable is None:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                        logger.warning(f"{self.name} stage queue full, dropping oldest item")
+                    except queue.Empty:
+                        pass
+                elif self._shed_oldest():
+                    self.dropped += 1
+                    logger.warning(f"{self.name} stage queue full, dropping oldest sheddable item")
+                elif self.sheddable(item):
+                    self.dropped += 1
+                    logger.warning(f"{self.name} stage queue full, dropping newest item")
+                    return False
+                else:
+                    self.blocked += 1
+                    logger.warning(f"{self.name} stage queue full, waiting for room")
+                    self.queue.put(entry)
+                    return True
+
+    def _shed_oldest(self):
+        """Remove the oldest queued item that may be shed; False if there is none"""
+        with self.queue.mutex:
+            for entry in self.queue.queue:
+                if self.sheddable(entry[1]):
+                    self.queue.queue.remove(entry)
+                    self.queue.not_full.notify()
+                    return True
+        return False
+
+    def process(self, items):
+        """Run the handler on a batch, recording its latency; returns its output"""
+        start = time.monotonic()
+        try:
+            return self.handler(items) or []
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error in {self.name} stage: {e}")
+            return []
+        finally:
+            self.service_latency.observe(time.monotonic() - start)
+
+    def start(self, app=None):
+        """Start the worker threads; `app` provides an application context per batch"""
+        if self.running:
+            return
+        self._app = app
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"pipeline-{self.name}-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _take_batch(self):
+        try:
+            entries = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(entries) < self.batch_size:
+            try:
+                entries.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        now = time.monotonic()
+        for enqueued_at, _ in entries:
+            self.wait_latency.observe(now - enqueued_at)
+        return [item for _, item in entries]
+
+    def _run(self):
+        while not self._stop.is_set():
+            items = self._take_batch()
+            if not items:
+                continue
+            if self._app is not None:
+                with self._app.app_context():
+                    output = self.process(items)
+            else:
+                output = self.process(items)
+            if self.downstream is not None:
+                for item in output:
+                    self.downstream.put(item)
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            'workers': self.workers,
+            'overflow': self.overflow,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'errors': self.errors,
+            'queue_wait': self.wait_latency.snapshot(),
+            'service': self.service_latency.snapshot()
+        }
+
+class Pipeline:
+    """A chain of stages, runnable on worker threads or synchronously"""
+    def __init__(self, *stages):
+        self.stages = stages
+        for stage, downstream in zip(stages, stages[1:]):
+            stage.downstream = downstream
+
+    @property
+    def running(self):
+        return all(stage.running for stage in self.stages)
+
+    def stage(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def submit(self, items):
+        """Hand items to the first stage's workers"""
+        for item in items:
+            self.stages[0].put(item)
+
+    def run(self, items):
+        """Push items through every stage in the calling thread; returns the final output"""
+        for stage in self.stages:
+            items = stage.process(items)
+            if not items:
+                break
+        return items
+
+    def start(self, app=None):
+        # Start from the end so no stage hands items to one that is not running yet
+        for stage in reversed(self.stages):
+            stage.start(app)
+
+    def stop(self, timeout=None):
+        for stage in self.stages:
+            stage.stop(timeout)
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,157 @@
+"""
+Per-fridge sensor polling schedules
+
+Every fridge gets its own APScheduler interval job. With adaptive polling
+enabled a fridge is sampled at ADAPTIVE_POLL_FAST_SECONDS after a door event
+or a threshold excursion, and the interval then grows by
+ADAPTIVE_POLL_BACKOFF per stable sample, up to ADAPTIVE_POLL_MAX_FACTOR times
+the fridge's base interval.
+"""
+import logging
+import threading
+
+from apscheduler.jobstores.base import JobLookupError
+
+from config import Config
+from clock import clock
+
+logger = logging.getLogger(__name__)
+
+def poll_job_id(fridge_id):
+    return f"check_fridge_{fridge_id}"
+
+class PollScheduler:
+    """Keeps one polling job per fridge and adapts its interval"""
+    def __init__(self, fast_seconds=Config.ADAPTIVE_POLL_FAST_SECONDS,
+                 max_factor=Config.ADAPTIVE_POLL_MAX_FACTOR,
+                 backoff=Config.ADAPTIVE_POLL_BACKOFF,
+                 stable_delta=Config.ADAPTIVE_POLL_STABLE_DELTA,
+                 stable_rate=Config.ADAPTIVE_POLL_STABLE_RATE):
+        self.fast_seconds = fast_seconds
+        self.max_factor = max_factor
+        self.backoff = backoff
+        self.stable_delta = stable_delta
+        self.stable_rate = stable_rate
+        self._scheduler = None
+        self._job = None
+        self._job_args = ()
+        self._base = {}           # fridge_id -> base interval in seconds
+        self._adaptive = {}       # fridge_id -> adaptive polling enabled
+        self._intervals = {}      # fridge_id -> current interval in seconds
+        self._last_sample = {}     # fridge_id -> (temperature, timestamp) of the previous sample
+        self._lock = threading.Lock()
+
+    def attach(self, scheduler, job, *args):
+        """Register `job(*args, fridge_id)` as the polling function on `scheduler`"""
+        self._scheduler = scheduler
+        self._job = job
+        self._job_args = args
+
+    def detach(self):
+        """Keep adapting intervals without touching any scheduler jobs"""
+        self._scheduler = None
+
+    def sync(self, fridges):
+        """Create, update or remove polling jobs so they match `fridges`"""
+        with self._lock:
+            wanted = {fridge.id for fridge in fridges}
+            for fridge_id in set(self._base) - wanted:
+                self._remove(fridge_id)
+
+            for fridge in fridges:
+                base = fridge.poll_interval_seconds or Config.POLL_INTERVAL_SECONDS
+                changed = (self._base.get(fridge.id) != base or
+                           self._adaptive.get(fridge.id) != fridge.adaptive_polling)
+                self._base[fridge.id] = base
+                self._adaptive[fridge.id] = fridge.adaptive_polling
+                if fridge.id not in self._intervals:
+                    self._intervals[fridge.id] = base
+                    self._add_job(fridge.id, base)
+                elif changed:
+                    self._set_interval(fridge.id, base)
+
+    def interval(self, fridge_id):
+        """Current polling interval of a fridge in seconds"""
+        return self._intervals.get(fridge_id)
+
+    def intervals(self):
+        return dict(self._intervals)
+
+    def boost(self, fridge_id):
+        """Switch a fridge to fast sampling, e.g. after a door event"""
+        with self._lock:
+            if self._adaptive.get(fridge_id):
+                self._set_interval(fridge_id, min(self.fast_seconds, self._base[fridge_id]))
+
+    def observe(self, fridge_id, temperature, excursion, timestamp=None):
+        """
+        Adapt a fridge's interval after it has been sampled
+
+        `excursion` is true while a threshold, defrost or door-open condition
+        is active. The temperature also counts as unstable while it changes
+        faster than `stable_rate` °C per minute since the previous sample, by
+        more than the `stable_delta` sensor noise. Using a rate keeps the
+        longer gaps of a backed-off fridge from looking like a sudden change.
+        """
+        timestamp = timestamp or clock.utcnow()
+        with self._lock:
+            if fridge_id not in self._base:
+                return
+            previous = self._last_sample.get(fridge_id)
+            if temperature is not None:
+                self._last_sample[fridge_id] = (temperature, timestamp)
+            if not self._adaptive[fridge_id]:
+                return
+
+            base = self._base[fridge_id]
+            changing = False
+            if temperature is not None and previous is not None:
+                delta = abs(temperature - previous[0])
+                minutes = (timestamp - previous[1]).total_seconds() / 60
+                changing = delta > self.stable_delta and (minutes <= 0 or delta / minutes > self.stable_rate)
+            if excursion or changing:
+                interval = min(self.fast_seconds, base)
+            else:
+                interval = min(self._intervals[fridge_id] * self.backoff, base * self.max_factor)
+            self._set_interval(fridge_id, interval)
+
+    def _add_job(self, fridge_id, seconds):
+        if self._scheduler is None:
+            return
+        try:
+            self._scheduler.add_job(
+                self._job,
+                'interval',
+                seconds=seconds,
+                args=[*self._job_args, fridge_id],
+                id=poll_job_id(fridge_id),
+                replace_existing=True
+            )
+        except Exception as e:
+            logger.error(f"Error scheduling polling of fridge {fridge_id}: {e}")
+            # Retried on the next sync
+            self._intervals.pop(fridge_id, None)
+
+    def _set_interval(self, fridge_id, seconds):
+        seconds = round(seconds, 1)
+        if self._intervals.get(fridge_id) == seconds:
+            return
+        self._intervals[fridge_id] = seconds
+        logger.debug(f"Polling fridge {fridge_id} every {seconds} seconds")
+        if self._scheduler is not None:
+            try:
+                self._scheduler.reschedule_job(poll_job_id(fridge_id), trigger='interval', seconds=seconds)
+            except Exception as e:
+                logger.error(f"Error rescheduling polling of fridge {fridge_id}: {e}")
+
+    def _remove(self, fridge_id):
+        for state in (self._base, self._adaptive, self._intervals, self._last_sample):
+            state.pop(fridge_id, None)
+        if self._scheduler is not None:
+            try:
+                self._scheduler.remove_job(poll_job_id(fridge_id))
+            except JobLookupError:
+                pass
+
+# Polling schedules of all fridges
+poll_scheduler = PollScheduler()
@@ -0,0 +1,155 @@
+"""
+In-memory ring buffers of the most recent readings per fridge
+
+The polling loop records every reading here so that "latest reading" and
+defrost detection never have to query the database.
+"""
+import threading
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from config import Config
+
+EPOCH = datetime(1970, 1, 1)
+
+# Lightweight stand-in for a TemperatureReading row
+CachedReading = namedtuple('CachedReading', ['temperature', 'humidity', 'timestamp'])
+
+class ReadingRing:
+    """Fixed-capacity, array-backed ring buffer of readings for one fridge"""
+    __slots__ = ('capacity', '_timestamps', '_temperatures', '_humidities', '_next', '_size')
+    
+    def __init__(self, capacity=Config.RECENT_READINGS_CAPACITY):
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._temperatures = array('d', bytes(8 * capacity))
+        self._humidities = array('d', bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+    
+    def __len__(self):
+        return self._size
+    
+    def append(self, temperature, humidity, timestamp):
+        """Add a reading, overwriting the oldest one when full"""
+        i = self._next
+        self._timestamps[i] = (timestamp - EPOCH).total_seconds()
+        self._temperatures[i] = temperature
+        self._humidities[i] = humidity
+        self._next = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+    
+    def _index(self, age):
+        """Array index of the reading `age` steps back from the newest"""
+        return (self._next - 1 - age) % self.capacity
+    
+    def latest(self):
+        """Return the newest reading, or None if the buffer is empty"""
+        if not self._size:
+            return None
+        i = self._index(0)
+        return CachedReading(
+            self._temperatures[i],
+            self._humidities[i],
+            EPOCH + timedelta(seconds=self._timestamps[i])
+        )
+    
+    def recent_temperatures(self, count):
+        """Return up to `count` temperatures, newest first"""
+        count = min(count, self._size)
+        return [self._temperatures[self._index(age)] for age in range(count)]
+
+class RecentReadings:
+    """Registry of ring buffers keyed by fridge ID"""
+    def __init__(self, capacity=Config.RECENT_READINGS_CAPACITY):
+        self.capacity = capacity
+        self._rings = {}
+        self._lock = threading.Lock()
+    
+    def _ring(self, fridge_id):
+        ring = self._rings.get(fridge_id)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.get(fridge_id)
+                if ring is None:
+                    ring = self._load(fridge_id)
+                    self._rings[fridge_id] = ring
+        return ring
+    
+    def _load(self, fridge_id):
+        """Build a ring from the database (only happens once per fridge)"""
+        from models import TemperatureReading
+        
+        ring = ReadingRing(self.capacity)
+        stored_readings = TemperatureReading.query.filter_by(
+            fridge_id=fridge_id
+        ).order_by(TemperatureReading.timestamp.desc()).limit(self.capacity).all()
+        
+        for reading in reversed(stored_readings):
+            ring.append(reading.temperature, reading.humidity, reading.timestamp)
+        return ring
+    
+    def preload(self, fridge_ids):
+        """Load the buffers of all given fridges that are not in memory yet, in one query"""
+        from app import db
+        from models import TemperatureReading
+        
+        missing = [fridge_id for fridge_id in fridge_ids if fridge_id not in self._rings]
+        if not missing:
+            return
+        
+        row_number = db.func.row_number().over(
+            partition_by=TemperatureReading.fridge_id,
+            order_by=TemperatureReading.timestamp.desc()
+        ).label('row_number')
+        ranked = db.select(
+            TemperatureReading.fridge_id,
+            TemperatureReading.temperature,
+            TemperatureReading.humidity,
+            TemperatureReading.timestamp,
+            row_number
+        ).where(TemperatureReading.fridge_id.in_(missing)).subquery()
+        
+        rows = db.session.execute(
+            db.select(ranked.c.fridge_id, ranked.c.temperature, ranked.c.humidity, ranked.c.timestamp)
+            .where(ranked.c.row_number <= self.capacity)
+            .order_by(ranked.c.fridge_id, ranked.c.timestamp.asc())
+        ).all()
+        
+        rings = {fridge_id: ReadingRing(self.capacity) for fridge_id in missing}
+        for fridge_id, temperature, humidity, timestamp in rows:
+            rings[fridge_id].append(temperature, humidity, timestamp)
+        
+        with self._lock:
+            for fridge_id, ring in rings.items():
+                self._rings.setdefault(fridge_id, ring)
+    
+    def record(self, fridge_id, temperature, humidity, timestamp):
+        """Add a new reading for a fridge"""
+        ring = self._ring(fridge_id)
+        with self._lock:
+            ring.append(temperature, humidity, timestamp)
+    
+    def latest(self, fridge_id):
+        """Return the newest reading for a fridge, or None"""
+        return self._ring(fridge_id).latest()
+    
+    def recent_temperatures(self, fridge_id, count):
+        """Return up to `count` recent temperatures for a fridge, newest first"""
+        return self._ring(fridge_id).recent_temperatures(count)
+    
+    def reset(self, fridge_ids):
+        """Start empty buffers for the given fridges instead of loading them from the database"""
+        with self._lock:
+            for fridge_id in fridge_ids:
+                self._rings[fridge_id] = ReadingRing(self.capacity)
+    
+    def forget(self, fridge_id):
+        """Drop the buffer for a fridge (e.g. after it was deleted)"""
+        with self._lock:
+            self._rings.pop(fridge_id, None)
+
+# Buffers shared by the polling loop, models and routes
+recent_readings = RecentReadings()
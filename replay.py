@@ -0,0 +1,324 @@
+"""
+Accelerated-time replay of the control loop
+
+Feeds a trace of sensor readings and door edges through the real
+`check_fridges` and `door_callback` code paths while a ManualClock stands in
+for the wall clock, so days of operation replay in seconds. Each fridge is
+polled on the schedule the adaptive PollScheduler would give it; a poll
+returns the most recent trace reading of the fridge (sample and hold).
+
+Traces are either synthetic (`synthetic_trace`) or loaded from the CSV files
+of the export API (`load_export_trace`). The replay writes readings, door
+events and alerts to the database bound to the app, so run it against a
+scratch database, e.g. through `benchmarks.common.load_app()`.
+"""
+import csv
+import heapq
+import math
+import time
+import random
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from config import Config
+from clock import clock, ManualClock
+
+logger = logging.getLogger(__name__)
+
+# kind is 'reading' (temperature, humidity set) or 'door' (is_open set)
+TraceEvent = namedtuple('TraceEvent', ['timestamp', 'fridge_id', 'kind', 'temperature', 'humidity', 'is_open'])
+
+def reading_event(timestamp, fridge_id, temperature, humidity):
+    return TraceEvent(timestamp, fridge_id, 'reading', temperature, humidity, None)
+
+def door_event(timestamp, fridge_id, is_open):
+    return TraceEvent(timestamp, fridge_id, 'door', None, None, is_open)
+
+def _fridge_trace(fridge, start, end, sample_seconds, door_events_per_hour, rng):
+    """Readings and door edges of one simulated fridge, in time order"""
+    from hardware_simulator import VirtualFridge, thermal_model_for
+
+    unit = VirtualFridge(fridge.id, thermal_model_for(fridge.target_temp),
+                         fridge.target_temp, 40.0, 0.0)
+    duration = (end - start).total_seconds()
+    next_door = rng.expovariate(door_events_per_hour / 3600.0) if door_events_per_hour > 0 else math.inf
+    elapsed = 0.0
+
+    while elapsed <= duration:
+        if next_door <= elapsed:
+            unit.advance(next_door)
+            unit.door_open = not unit.door_open
+            yield door_event(start + timedelta(seconds=next_door), fridge.id, unit.door_open)
+            if unit.door_open:
+                next_door += rng.expovariate(1.0 / Config.SIMULATOR_DOOR_OPEN_SECONDS)
+            else:
+                next_door += rng.expovariate(door_events_per_hour / 3600.0)
+            continue
+
+        unit.advance(elapsed)
+        # Thermostat with half a degree of hysteresis, as recorded from a real unit
+        if unit.temperature > fridge.target_temp + 0.5:
+            unit.compressor_on = True
+        elif unit.temperature < fridge.target_temp - 0.5:
+            unit.compressor_on = False
+        noise = unit.model.sensor_noise
+        yield reading_event(start + timedelta(seconds=elapsed), fridge.id,
+                            round(unit.temperature + rng.gauss(0, noise), 1),
+                            round(unit.humidity + rng.gauss(0, noise * 5), 1))
+        elapsed += sample_seconds
+
+    if unit.door_open:
+        yield door_event(end, fridge.id, False)
+
+def synthetic_trace(fridges, start, days=1, sample_seconds=30,
+                    door_events_per_hour=Config.SIMULATOR_DOOR_EVENTS_PER_HOUR, seed=None):
+    """
+    Generate a trace for `fridges` (FridgeSettings) covering `days` from `start`
+
+    Temperatures follow the simulator's thermal model with a simple
+    thermostat; door openings arrive at random. The trace is produced lazily
+    and merged across fridges in time order.
+    """
+    end = start + timedelta(days=days)
+    rng = random.Random(seed)
+    traces = [
+        _fridge_trace(fridge, start, end, sample_seconds, door_events_per_hour,
+                      random.Random(rng.random()))
+        for fridge in fridges
+    ]
+    return heapq.merge(*traces, key=lambda event: event.timestamp)
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+def load_export_trace(fridge_id, readings_csv=None, door_events_csv=None):
+    """
+    Build a trace from CSV files of /api/export (readings and door_events)
+
+    Returns a time-ordered list of events attributed to `fridge_id`.
+    """
+    events = []
+    if readings_csv:
+        with open(readings_csv, newline='') as f:
+            for row in csv.DictReader(f):
+                if row['temperature'] and row['humidity']:
+                    events.append(reading_event(_parse_timestamp(row['timestamp']), fridge_id,
+                                                float(row['temperature']), float(row['humidity'])))
+    if door_events_csv:
+        with open(door_events_csv, newline='') as f:
+            for row in csv.DictReader(f):
+                events.append(door_event(_parse_timestamp(row['timestamp']), fridge_id,
+                                         row['event_type'] == 'open'))
+    events.sort(key=lambda event: event.timestamp)
+    return events
+
+class RecordingActuators:
+    """Stands in for the ActuatorScheduler during a replay and only counts requests"""
+    def __init__(self):
+        self.buzzes = 0
+        self.relay_switches = 0
+        self.relay_states = {}
+
+    def buzz(self, duration=1.0, repeat=1, pause=0.5):
+        self.buzzes += repeat
+
+    def set_relay(self, pin, state):
+        if self.relay_states.get(pin) != state:
+            self.relay_states[pin] = state
+            self.relay_switches += 1
+
+    def reset_relay(self, pin):
+        self.relay_states.pop(pin, None)
+
+    def silence(self):
+        pass
+
+class ReplayDriver:
+    """
+    Runs a trace through the control loop under a manual clock
+
+    `flush_interval` (simulated seconds) batches the reading inserts of
+    several polling cycles; by default readings are flushed as configured by
+    READING_FLUSH_INTERVAL_SECONDS, exactly as in production.
+
+    Each run starts from empty control loop state (door open times,
+    compressor states, recent readings, alert repeat times) and restores the
+    live state afterwards. Cache invalidations and SSE events of the replay go
+    to private instances, so dashboard clients never see them.
+    
+    The manual clock replaces the process-wide clock for the whole run, so the
+    background scheduler must not be running; run replays in a process of
+    their own (see `benchmarks.common.load_app()`).
+    """
+    def __init__(self, app, flush_interval=None):
+        self.app = app
+        self.flush_interval = flush_interval
+
+    def run(self, trace, until=None):
+        """
+        Replay `trace` (time-ordered TraceEvents) and return a summary dict
+
+        Polling stops at `until`, or at the last event of the trace. Background
+        workers that would race with the replay (pipeline stages, door event
+        worker, simulated door events) are paused and started again afterwards.
+        Raises RuntimeError while the background scheduler is running.
+        """
+        import hardware_controller
+        import sensor_handlers
+        from app import db, scheduler
+        from cache import TTLCache
+        from events import EventBroker
+        from models import Alert, TemperatureReading
+        from polling import PollScheduler
+        from fridge_config import fridge_configs
+        from ingestion import ReadingBuffer
+        from reading_cache import RecentReadings
+
+        # Scheduled jobs would run under the replay's manual clock
+        if scheduler.running:
+            raise RuntimeError("Cannot replay while the background scheduler is running")
+        
+        trace = iter(trace)
+        first = next(trace, None)
+        if first is None:
+            return None
+
+        pipeline_running = sensor_handlers.ingestion_pipeline.running
+        door_worker = hardware_controller.door_event_worker
+        door_worker_running = door_worker is not None and door_worker.running
+        simulated_state = None
+        if not sensor_handlers.is_raspberry_pi:
+            from hardware_simulator import simulated_state
+        door_events_running = simulated_state is not None and simulated_state.door_events_running
+        if pipeline_running:
+            sensor_handlers.ingestion_pipeline.stop()
+        if door_worker_running:
+            door_worker.stop()
+        if door_events_running:
+            simulated_state.stop_door_events()
+
+        # The replay runs on its own copies of the control loop's state, so it
+        # neither starts from nor leaves behind the live process state
+        saved_state = {
+            name: dict(getattr(sensor_handlers, name))
+            for name in ('door_open_times', 'compressor_states', 'alert_repeat_times')
+        }
+        for name in saved_state:
+            getattr(sensor_handlers, name).clear()
+        saved = (sensor_handlers.reading_source, sensor_handlers.poll_scheduler, sensor_handlers.actuators,
+                 sensor_handlers.reading_buffer, sensor_handlers.recent_readings,
+                 sensor_handlers.response_cache, sensor_handlers.broker)
+
+        latest = {}
+        poll_scheduler = PollScheduler()
+        actuators = RecordingActuators()
+        recent_readings = RecentReadings()
+        manual_clock = ManualClock(first.timestamp)
+        cycles = polls = readings = door_edges = 0
+        started = time.perf_counter()
+        try:
+            with self.app.app_context(), clock.use(manual_clock):
+                # Created under the manual clock so its flush age is in replay time
+                reading_buffer = ReadingBuffer(
+                    flush_interval=Config.READING_FLUSH_INTERVAL_SECONDS if self.flush_interval is None
+                    else self.flush_interval
+                )
+                sensor_handlers.reading_source = lambda fridges: {
+                    fridge.id: latest.get(fridge.id, (None, None)) for fridge in fridges
+                }
+                sensor_handlers.poll_scheduler = poll_scheduler
+                sensor_handlers.actuators = actuators
+                sensor_handlers.reading_buffer = reading_buffer
+                sensor_handlers.recent_readings = recent_readings
+                sensor_handlers.response_cache = TTLCache()
+                sensor_handlers.broker = EventBroker()
+
+                snapshot = fridge_configs.current()
+                recent_readings.reset(snapshot.fridges)
+                poll_scheduler.sync(snapshot.select())
+                due = [(first.timestamp, fridge_id) for fridge_id in snapshot.fridges]
+                heapq.heapify(due)
+
+                def poll_until(moment):
+                    nonlocal cycles, polls
+                    while due and due[0][0] <= moment:
+                        now = due[0][0]
+                        fridge_ids = []
+                        while due and due[0][0] == now:
+                            fridge_ids.append(heapq.heappop(due)[1])
+                        manual_clock.set(now)
+                        sensor_handlers.check_fridges(fridge_ids)
+                        cycles += 1
+                        polls += len(fridge_ids)
+                        for fridge_id in fridge_ids:
+                            interval = poll_scheduler.interval(fridge_id) or Config.POLL_INTERVAL_SECONDS
+                            heapq.heappush(due, (now + timedelta(seconds=interval), fridge_id))
+
+                last = first.timestamp
+                event = first
+                while event is not None:
+                    poll_until(event.timestamp)
+                    manual_clock.set(event.timestamp)
+                    last = event.timestamp
+                    if event.kind == 'reading':
+                        latest[event.fridge_id] = (event.temperature, event.humidity)
+                        readings += 1
+                    else:
+                        fridge = snapshot.get(event.fridge_id)
+                        pin = fridge.door_sensor_pin if fridge else None
+                        sensor_handlers.door_callback(pin, event.fridge_id, event.is_open)
+                        door_edges += sensor_handlers.process_door_edges(sensor_handlers.drain_door_queue())
+                    event = next(trace, None)
+
+                end = until or last
+                poll_until(end)
+                reading_buffer.flush()
+                db.session.commit()
+                elapsed = time.perf_counter() - started
+
+                alerts = dict(
+                    db.session.query(Alert.alert_type, db.func.count(Alert.id))
+                    .filter(Alert.timestamp >= first.timestamp, Alert.timestamp <= end)
+                    .group_by(Alert.alert_type).all()
+                )
+                stored_readings = TemperatureReading.query.filter(
+                    TemperatureReading.timestamp >= first.timestamp,
+                    TemperatureReading.timestamp <= end
+                ).count()
+        finally:
+            (sensor_handlers.reading_source, sensor_handlers.poll_scheduler, sensor_handlers.actuators,
+             sensor_handlers.reading_buffer, sensor_handlers.recent_readings,
+             sensor_handlers.response_cache, sensor_handlers.broker) = saved
+            # The replay wrote to the database behind the live cache's back
+            sensor_handlers.response_cache.clear()
+            for name, state in saved_state.items():
+                getattr(sensor_handlers, name).clear()
+                getattr(sensor_handlers, name).update(state)
+            if pipeline_running:
+                sensor_handlers.ingestion_pipeline.start(self.app)
+            if door_worker_running:
+                door_worker.start()
+            if door_events_running:
+                simulated_state.start_door_events()
+
+        simulated_seconds = (end - first.timestamp).total_seconds()
+        return {
+            'start': first.timestamp,
+            'end': end,
+            'simulated_seconds': simulated_seconds,
+            'elapsed_seconds': elapsed,
+            'speedup': simulated_seconds / elapsed if elapsed else None,
+            'cycles': cycles,
+            'cycles_per_second': cycles / elapsed if elapsed else None,
+            'polls': polls,
+            'trace_readings': readings,
+            'stored_readings': stored_readings,
+            'door_edges': door_edges,
+            'alerts': alerts,
+            'buzzes': actuators.buzzes,
+            'relay_switches': actuators.relay_switches
+        }
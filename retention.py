@@ -0,0 +1,128 @@
+"""
+Chunked data retention
+
+Expired rows are deleted in bounded batches, each in its own short
+transaction, with a pause in between so the polling loop and door callbacks
+are never locked out of the database for long.
+"""
+import re
+import time
+import logging
+from datetime import datetime, timedelta
+
+from config import Config
+from clock import clock
+from app import db
+from models import TemperatureReading, ReadingRollup, DoorEvent, Alert
+
+logger = logging.getLogger(__name__)
+
+# Results of the most recent retention run, keyed by table name
+last_run_stats = {}
+
+def purge_before(model, column, cutoff, *criteria, batch_size=None, pause=None):
+    """
+    Delete rows of `model` whose `column` is older than `cutoff`, in batches
+    
+    Extra SQLAlchemy `criteria` narrow down which rows are eligible. Returns
+    a dict with the number of rows deleted, batches run and elapsed seconds.
+    """
+    batch_size = batch_size or Config.RETENTION_BATCH_SIZE
+    pause = Config.RETENTION_BATCH_PAUSE_SECONDS if pause is None else pause
+    table = model.__tablename__
+    
+    started = time.monotonic()
+    deleted = 0
+    batches = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(model.id).filter(
+            column < cutoff, *criteria
+        ).order_by(model.id).limit(batch_size).all()]
+        if not ids:
+            break
+        
+        deleted += db.session.query(model).filter(
+            model.id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        batches += 1
+        
+        if batches % 20 == 0:
+            logger.info(f"Retention on {table}: {deleted} rows deleted so far")
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    
+    stats = {
+        'deleted': deleted,
+        'batches': batches,
+        'seconds': round(time.monotonic() - started, 3),
+        'cutoff': cutoff.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    last_run_stats[table] = stats
+    return stats
+
+def drop_expired_partitions(model, cutoff):
+    """
+    Drop range partitions of `model`'s table that lie entirely before `cutoff`
+    
+    Only applies to PostgreSQL tables partitioned by timestamp range; returns
+    the names of the dropped partitions (empty on other databases).
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return []
+    
+    partitions = db.session.execute(db.text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+        "FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {'table': model.__tablename__}).all()
+    
+    dropped = []
+    for name, bound in partitions:
+        match = re.search(r"TO \('([^']+)'\)", bound or '')
+        if not match:
+            continue
+        upper = datetime.fromisoformat(match.group(1))
+        if upper <= cutoff:
+            db.session.execute(db.text(f'DROP TABLE "{name}"'))
+            db.session.commit()
+            dropped.append(name)
+            logger.info(f"Dropped expired partition {name}")
+    return dropped
+
+def run_retention():
+    """Apply the retention periods from Config to every table"""
+    now = clock.utcnow()
+    policies = [
+        (TemperatureReading, TemperatureReading.timestamp,
+         now - timedelta(days=Config.TEMP_DATA_RETENTION_DAYS), ()),
+        (DoorEvent, DoorEvent.timestamp,
+         now - timedelta(days=Config.DOOR_EVENT_RETENTION_DAYS), ()),
+        (Alert, Alert.timestamp,
+         now - timedelta(days=Config.ALERT_RETENTION_DAYS), (Alert.acknowledged == True,)),
+    ]
+    
+    results = {}
+    for model, column, cutoff, criteria in policies:
+        if Config.RETENTION_DROP_PARTITIONS and not criteria:
+            drop_expired_partitions(model, cutoff)
+        results[model.__tablename__] = purge_before(model, column, cutoff, *criteria)
+    
+    # Rollups are kept per resolution, longer than raw readings
+    rollups_deleted = 0
+    for resolution, retention_days in Config.ROLLUP_RETENTION_DAYS.items():
+        if retention_days is None:
+            continue
+        stats = purge_before(
+            ReadingRollup, ReadingRollup.bucket_start,
+            now - timedelta(days=retention_days),
+            ReadingRollup.resolution == resolution
+        )
+        rollups_deleted += stats['deleted']
+    results[ReadingRollup.__tablename__] = {'deleted': rollups_deleted}
+    last_run_stats[ReadingRollup.__tablename__] = results[ReadingRollup.__tablename__]
+    
+    return results
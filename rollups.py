@@ -0,0 +1,185 @@
+"""
+Pre-aggregated reading rollups
+
+Per-fridge min/max/sum/count buckets are kept at several resolutions
+(Config.ROLLUP_RETENTION_DAYS) and updated incrementally as readings are
+ingested, so long-range charts and daily statistics never have to scan raw
+readings, and history survives raw data retention.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from config import Config
+from app import db
+from models import TemperatureReading, ReadingRollup
+from utils import epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+RESOLUTIONS = tuple(sorted(Config.ROLLUP_RETENTION_DAYS))
+
+def _epoch(timestamp):
+    return int((timestamp - EPOCH).total_seconds())
+
+def apply_readings(rows):
+    """
+    Fold newly ingested readings into the rollup buckets
+    
+    `rows` are dicts with fridge_id, temperature, humidity and timestamp, as
+    written by the ingestion buffer. Runs in the current session; the caller
+    commits.
+    """
+    aggregates = {}
+    for row in rows:
+        epoch = _epoch(row['timestamp'])
+        temperature = row['temperature']
+        humidity = row['humidity']
+        for resolution in RESOLUTIONS:
+            key = (row['fridge_id'], resolution, EPOCH + timedelta(seconds=epoch - epoch % resolution))
+            agg = aggregates.get(key)
+            if agg is None:
+                aggregates[key] = [1, temperature, temperature, temperature, humidity, humidity, humidity]
+            else:
+                agg[0] += 1
+                agg[1] += temperature
+                agg[2] = min(agg[2], temperature)
+                agg[3] = max(agg[3], temperature)
+                agg[4] += humidity
+                agg[5] = min(agg[5], humidity)
+                agg[6] = max(agg[6], humidity)
+    
+    if not aggregates:
+        return 0
+    
+    existing = {
+        (rollup.fridge_id, rollup.resolution, rollup.bucket_start): rollup
+        for rollup in ReadingRollup.query.filter(
+            ReadingRollup.fridge_id.in_({key[0] for key in aggregates}),
+            ReadingRollup.resolution.in_(RESOLUTIONS),
+            ReadingRollup.bucket_start.in_({key[2] for key in aggregates})
+        ).all()
+    }
+    
+    new_rollups = []
+    for key, (count, temp_sum, temp_min, temp_max, hum_sum, hum_min, hum_max) in aggregates.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            fridge_id, resolution, bucket_start = key
+            new_rollups.append({
+                'fridge_id': fridge_id,
+                'resolution': resolution,
+                'bucket_start': bucket_start,
+                'count': count,
+                'temperature_sum': temp_sum,
+                'temperature_min': temp_min,
+                'temperature_max': temp_max,
+                'humidity_sum': hum_sum,
+                'humidity_min': hum_min,
+                'humidity_max': hum_max
+            })
+        else:
+            rollup.count += count
+            rollup.temperature_sum += temp_sum
+            rollup.temperature_min = min(rollup.temperature_min, temp_min)
+            rollup.temperature_max = max(rollup.temperature_max, temp_max)
+            rollup.humidity_sum += hum_sum
+            rollup.humidity_min = min(rollup.humidity_min, hum_min)
+            rollup.humidity_max = max(rollup.humidity_max, hum_max)
+    
+    if new_rollups:
+        db.session.execute(ReadingRollup.__table__.insert(), new_rollups)
+    return len(aggregates)
+
+def rebuild_rollups(since=None):
+    """
+    Recompute rollups from raw readings with set-based GROUP BY queries
+    
+    Used to backfill databases created before rollups existed. Buckets from
+    `since` onwards are replaced.
+    """
+    for resolution in RESOLUTIONS:
+        bucket = (epoch_seconds(TemperatureReading.timestamp) // resolution * resolution).label('bucket')
+        query = db.session.query(
+            TemperatureReading.fridge_id,
+            bucket,
+            db.func.count(TemperatureReading.id),
+            db.func.sum(TemperatureReading.temperature),
+            db.func.min(TemperatureReading.temperature),
+            db.func.max(TemperatureReading.temperature),
+            db.func.sum(TemperatureReading.humidity),
+            db.func.min(TemperatureReading.humidity),
+            db.func.max(TemperatureReading.humidity)
+        )
+        delete = db.session.query(ReadingRollup).filter(ReadingRollup.resolution == resolution)
+        if since is not None:
+            bucket_since = EPOCH + timedelta(seconds=_epoch(since) - _epoch(since) % resolution)
+            query = query.filter(TemperatureReading.timestamp >= bucket_since)
+            delete = delete.filter(ReadingRollup.bucket_start >= bucket_since)
+        delete.delete(synchronize_session=False)
+        
+        rows = [{
+            'fridge_id': fridge_id,
+            'resolution': resolution,
+            'bucket_start': EPOCH + timedelta(seconds=bucket_epoch),
+            'count': count,
+            'temperature_sum': temp_sum,
+            'temperature_min': temp_min,
+            'temperature_max': temp_max,
+            'humidity_sum': hum_sum,
+            'humidity_min': hum_min,
+            'humidity_max': hum_max
+        } for fridge_id, bucket_epoch, count, temp_sum, temp_min, temp_max, hum_sum, hum_min, hum_max
+            in query.group_by(TemperatureReading.fridge_id, bucket).all()]
+        
+        for offset in range(0, len(rows), 5000):
+            db.session.execute(ReadingRollup.__table__.insert(), rows[offset:offset + 5000])
+        logger.info(f"Rebuilt {len(rows)} rollups at {resolution}s resolution")
+    
+    db.session.commit()
+
+def coarsest_resolution(max_seconds, aligned_to=()):
+    """
+    Return the largest rollup resolution not exceeding `max_seconds`
+    
+    If `aligned_to` timestamps are given the resolution must also divide them
+    evenly, so whole buckets cover the range exactly. Returns None if no
+    resolution qualifies.
+    """
+    for resolution in reversed(RESOLUTIONS):
+        if resolution <= max_seconds and all(_epoch(ts) % resolution == 0 for ts in aligned_to):
+            return resolution
+    return None
+
+def get_average_readings(fridge_ids, start, end):
+    """
+    Return fridge_id -> (avg temperature, avg humidity) over [start, end)
+    
+    Answered from the coarsest rollup that tiles the range exactly, falling
+    back to raw readings when none does.
+    """
+    resolution = coarsest_resolution(_epoch(end) - _epoch(start), aligned_to=(start, end))
+    if resolution is None:
+        rows = db.session.query(
+            TemperatureReading.fridge_id,
+            db.func.avg(TemperatureReading.temperature),
+            db.func.avg(TemperatureReading.humidity)
+        ).filter(
+            TemperatureReading.fridge_id.in_(fridge_ids),
+            TemperatureReading.timestamp >= start,
+            TemperatureReading.timestamp < end
+        ).group_by(TemperatureReading.fridge_id).all()
+    else:
+        total = db.func.sum(ReadingRollup.count)
+        rows = db.session.query(
+            ReadingRollup.fridge_id,
+            db.func.sum(ReadingRollup.temperature_sum) / total,
+            db.func.sum(ReadingRollup.humidity_sum) / total
+        ).filter(
+            ReadingRollup.fridge_id.in_(fridge_ids),
+            ReadingRollup.resolution == resolution,
+            ReadingRollup.bucket_start >= start,
+            ReadingRollup.bucket_start < end
+        ).group_by(ReadingRollup.fridge_id).all()
+    
+    return {fridge_id: (avg_temp, avg_humidity) for fridge_id, avg_temp, avg_humidity in rows}
@@ -1,55 +1,98 @@
+import gzip
+import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from flask import render_template, request, jsonify, redirect, url_for, flash
+from flask import render_template, request, jsonify, redirect, url_for, flash, session, Response, stream_with_context
 
 from app import db
+from config import Config
+from clock import clock
 from models import Fridge, Alert, MaintenanceRecord
+from dashboard import get_dashboard_data
+from events import broker, alert_payload
+from cache import response_cache
+from fridge_config import fridge_configs
+from export import stream_export, DATASETS, FORMATS
+from wire_format import (
+    fetch_columns, encode_json, encode_binary, encode_arrow,
+    available_mimetypes, BINARY_MIMETYPE, ARROW_MIMETYPE
+)
 from utils import (
-    get_temperature_data, calculate_daily_stats, 
+    get_temperature_data, get_temperature_data_since, calculate_daily_stats, 
     acknowledge_alert, log_maintenance, reset_maintenance_date
 )
 
+# Brotli is optional; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 logger = logging.getLogger(__name__)
 
+def cached_json(key, compute, sliding=False):
+    """
+    JSON response served from the response cache with a strong ETag
+    
+    Returns 304 Not Modified when the client already holds the current
+    version, without computing or serializing anything. Pass `sliding=True`
+    for views over a window relative to now, so they expire as it moves.
+    """
+    if sliding:
+        key = response_cache.window_key(key)
+    etag = response_cache.etag(key)
+    if any(request.if_none_match.contains(etag + suffix) for suffix in ('', '-gzip', '-br')):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    response = jsonify(response_cache.get_or_compute(key, compute))
+    response.set_etag(etag)
+    return response
+
 def register_routes(app):
+    @app.after_request
+    def compress_response(response):
+        """Compress large responses with brotli or gzip when the client accepts it"""
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in ('application/json', 'text/html')):
+            return response
+        
+        data = response.get_data()
+        if len(data) < Config.COMPRESS_MIN_BYTES:
+            return response
+        
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            encoding, body = 'br', brotli.compress(data)
+        elif accepted['gzip']:
+            encoding, body = 'gzip', gzip.compress(data, compresslevel=6)
+        else:
+            return response
+        
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        # Each encoding is a different representation, so it gets its own ETag
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
+
     @app.route('/')
     def index():
         """Main dashboard showing all fridges"""
-        fridges = Fridge.query.all()
+        def render():
+            # Current readings, door state, alerts and stats for all fridges
+            fridge_data = get_dashboard_data()
+            return render_template('index.html', fridge_data=fridge_data)
         
-        # Get current readings and status for each fridge
-        fridge_data = []
-        for fridge in fridges:
-            # Get current temperature reading
-            current_reading = fridge.get_current_reading()
-            
-            # Get daily stats
-            stats = calculate_daily_stats(fridge.id)
-            
-            # Check if maintenance is due
-            days_until_maintenance = fridge.days_until_maintenance()
-            
-            # Get active alerts
-            active_alerts = Alert.query.filter_by(
-                fridge_id=fridge.id,
-                acknowledged=False
-            ).order_by(Alert.timestamp.desc()).all()
-            
-            # Is door currently open?
-            door_open = fridge.is_door_open()
-            
-            # Add fridge data
-            fridge_data.append({
-                'fridge': fridge,
-                'current_reading': current_reading,
-                'stats': stats,
-                'days_until_maintenance': days_until_maintenance,
-                'active_alerts': active_alerts,
-                'door_open': door_open
-            })
-        
-        return render_template('index.html', fridge_data=fridge_data)
+        # Pages carrying flashed messages are one-offs and must not be cached
+        if '_flashes' in session:
+            return render()
+        return response_cache.get_or_compute(('index', None), render)
 
     @app.route('/fridge/<int:fridge_id>')
     def fridge_detail(fridge_id):
@@ -101,10 +144,12 @@ def register_routes(app):
             stats=stats,
             maintenance_history=maintenance_history,
             active_alerts=active_alerts,
+            active_alerts_data=[alert_payload(alert) for alert in active_alerts],
             recent_alerts=recent_alerts,
             door_open=door_open,
             recovery_time=recovery_time,
-            duration=duration
+            duration=duration,
+            config_max_chart_points=Config.MAX_CHART_POINTS
         )
 
     @app.route('/settings')
@@ -134,20 +179,24 @@ def register_routes(app):
             # Update maintenance settings
             fridge.maintenance_interval_days = int(request.form.get('maintenance_interval_days', fridge.maintenance_interval_days))
             
-            # Update hardware pins (be careful with this)
+            # Update sampling settings
+            poll_interval_seconds = int(request.form.get('poll_interval_seconds', fridge.poll_interval_seconds))
+            min_poll_interval = max(5, Config.ADAPTIVE_POLL_FAST_SECONDS)
+            if poll_interval_seconds < min_poll_interval:
+                raise ValueError(f"sampling interval must be at least {min_poll_interval} seconds")
+            fridge.poll_interval_seconds = poll_interval_seconds
+            fridge.adaptive_polling = 'adaptive_polling' in request.form
+            
+            # Update hardware pins (rewired by the hardware registry on refresh)
             fridge.dht22_pin = int(request.form.get('dht22_pin', fridge.dht22_pin))
             fridge.door_sensor_pin = int(request.form.get('door_sensor_pin', fridge.door_sensor_pin))
             fridge.relay_pin = int(request.form.get('relay_pin', fridge.relay_pin))
             
             db.session.commit()
+            response_cache.invalidate_fridge(fridge_id)
+            fridge_configs.refresh()
             flash('Fridge settings updated successfully', 'success')
             
-            # Note: Changing pins requires restarting the application to take effect
-            if (int(request.form.get('dht22_pin')) != fridge.dht22_pin or
-                int(request.form.get('door_sensor_pin')) != fridge.door_sensor_pin or
-                int(request.form.get('relay_pin')) != fridge.relay_pin):
-                flash('Hardware pin changes require restarting the application to take effect', 'warning')
-                
         except Exception as e:
             db.session.rollback()
             logger.error(f"Error updating fridge: {e}")
@@ -188,50 +237,176 @@ def register_routes(app):
     @app.route('/api/temperature_data/<int:fridge_id>')
     def api_temperature_data(fridge_id):
         """API endpoint to get temperature data for charts"""
+        # Incremental fetch: only readings newer than the cursor
+        since = request.args.get('since')
+        if since:
+            try:
+                since = int(since)
+            except ValueError:
+                try:
+                    since = datetime.fromisoformat(since)
+                except ValueError:
+                    return jsonify({'error': 'since must be a reading ID or ISO timestamp'}), 400
+                if since.tzinfo is not None:
+                    since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            
+            return cached_json(
+                ('temperature_data_since', fridge_id, str(since)),
+                lambda: get_temperature_data_since(fridge_id, since)
+            )
+        
         days = request.args.get('days', '1')
         try:
             days = int(days)
         except ValueError:
             days = 1
+        
+        points = request.args.get('points', str(Config.MAX_CHART_POINTS))
+        try:
+            points = min(max(int(points), 1), Config.MAX_CHART_POINTS_LIMIT)
+        except ValueError:
+            points = Config.MAX_CHART_POINTS
             
-        data = get_temperature_data(fridge_id, days=days)
-        return jsonify(data)
+        return cached_json(
+            ('temperature_data', fridge_id, days, points),
+            lambda: get_temperature_data(fridge_id, days=days, points=points),
+            sliding=True
+        )
+
+    @app.route('/api/timeseries/<int:fridge_id>')
+    def api_timeseries(fridge_id):
+        """
+        Bulk time-series export in a compact columnar format
+        
+        Chooses delta-encoded JSON, packed binary or Arrow IPC from the Accept header.
+        """
+        Fridge.query.get_or_404(fridge_id)
+        
+        days = request.args.get('days', '1')
+        try:
+            days = min(max(int(days), 1), Config.TEMP_DATA_RETENTION_DAYS)
+        except ValueError:
+            days = 1
+        
+        mimetype = request.accept_mimetypes.best_match(available_mimetypes(), default='application/json')
+        columns = fetch_columns(fridge_id, clock.utcnow() - timedelta(days=days))
+        
+        if mimetype == BINARY_MIMETYPE:
+            return Response(encode_binary(*columns), mimetype=BINARY_MIMETYPE)
+        if mimetype == ARROW_MIMETYPE:
+            return Response(encode_arrow(*columns), mimetype=ARROW_MIMETYPE)
+        return jsonify(encode_json(*columns))
+
+    @app.route('/api/export/<int:fridge_id>')
+    @app.route('/api/export/<int:fridge_id>/<dataset>')
+    def api_export(fridge_id, dataset='readings'):
+        """Stream readings, door events or alerts as CSV or NDJSON for audits"""
+        fridge = Fridge.query.get_or_404(fridge_id)
+        
+        export_format = request.args.get('format', 'csv')
+        if dataset not in DATASETS or export_format not in FORMATS:
+            return jsonify({
+                'error': f"dataset must be one of {sorted(DATASETS)} and format one of {sorted(FORMATS)}"
+            }), 400
+        
+        # Optional ISO date/time range, start inclusive and end exclusive;
+        # values with an offset are converted to the naive UTC stored in the database
+        def parse_time(name):
+            if not request.args.get(name):
+                return None
+            value = datetime.fromisoformat(request.args[name])
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return value
+        
+        try:
+            start = parse_time('start')
+            end = parse_time('end')
+        except ValueError:
+            return jsonify({'error': 'start and end must be ISO dates or timestamps'}), 400
+        
+        filename = f"fridge{fridge.id}_{dataset}.{export_format}"
+        return Response(
+            stream_with_context(stream_export(dataset, fridge_id, export_format, start, end)),
+            mimetype=FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
 
     @app.route('/api/stats/<int:fridge_id>')
     def api_stats(fridge_id):
         """API endpoint to get current stats"""
-        stats = calculate_daily_stats(fridge_id)
-        fridge = Fridge.query.get_or_404(fridge_id)
-        current_reading = fridge.get_current_reading()
-        
-        if current_reading:
-            stats['current_temp'] = round(current_reading.temperature, 1)
-            stats['current_humidity'] = round(current_reading.humidity, 1)
-        else:
-            stats['current_temp'] = None
-            stats['current_humidity'] = None
+        def compute():
+            fridge = Fridge.query.get_or_404(fridge_id)
+            stats = calculate_daily_stats(fridge_id)
+            current_reading = fridge.get_current_reading()
             
-        stats['door_open'] = fridge.is_door_open()
-        stats['compressor_status'] = fridge.compressor_status
+            if current_reading:
+                stats['current_temp'] = round(current_reading.temperature, 1)
+                stats['current_humidity'] = round(current_reading.humidity, 1)
+            else:
+                stats['current_temp'] = None
+                stats['current_humidity'] = None
+                
+            stats['door_open'] = fridge.is_door_open()
+            stats['compressor_status'] = fridge.compressor_status
+            return stats
         
-        return jsonify(stats)
+        return cached_json(('stats', fridge_id), compute, sliding=True)
 
     @app.route('/api/alerts/<int:fridge_id>')
     def api_alerts(fridge_id):
         """API endpoint to get active alerts"""
-        active_alerts = Alert.query.filter_by(
-            fridge_id=fridge_id,
-            acknowledged=False
-        ).order_by(Alert.timestamp.desc()).all()
+        def compute():
+            active_alerts = Alert.query.filter_by(
+                fridge_id=fridge_id,
+                acknowledged=False
+            ).order_by(Alert.timestamp.desc()).all()
+            
+            return [alert_payload(alert) for alert in active_alerts]
+        
+        return cached_json(('alerts', fridge_id), compute)
+
+    @app.route('/api/cache_stats')
+    def api_cache_stats():
+        """API endpoint exposing response cache counters for monitoring"""
+        return jsonify(response_cache.stats())
+
+    @app.route('/api/pipeline_stats')
+    def api_pipeline_stats():
+        """API endpoint exposing ingestion pipeline queue depths and stage latencies"""
+        from sensor_handlers import ingestion_pipeline
+        return jsonify(ingestion_pipeline.stats())
+
+    @app.route('/api/stream')
+    @app.route('/api/stream/<int:fridge_id>')
+    def api_stream(fridge_id=None):
+        """
+        Server-Sent Events stream of reading, door, compressor and alert changes
         
-        alerts_data = [{
-            'id': alert.id,
-            'type': alert.alert_type,
-            'message': alert.message,
-            'timestamp': alert.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-        } for alert in active_alerts]
+        Each stream occupies a server thread, so it is closed after
+        EVENT_STREAM_MAX_SECONDS; the browser reconnects and resynchronises.
+        """
+        subscription = broker.subscribe(fridge_id)
         
-        return jsonify(alerts_data)
+        def generate():
+            deadline = time.monotonic() + Config.EVENT_STREAM_MAX_SECONDS
+            try:
+                # Ask browsers to wait 5 seconds before reconnecting
+                yield "retry: 5000\n\n"
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    message = subscription.get(timeout=min(remaining, Config.EVENT_STREAM_KEEPALIVE_SECONDS))
+                    yield message if message is not None else ": keepalive\n\n"
+            finally:
+                broker.unsubscribe(subscription)
+        
+        return Response(
+            generate(),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.route('/reset_maintenance/<int:fridge_id>', methods=['POST'])
     def reset_maintenance_route(fridge_id):
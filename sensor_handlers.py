@@ -1,8 +1,10 @@
 import time
+import queue
 import logging
 import threading
 import platform
-from datetime import datetime, timedelta
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -26,15 +28,47 @@ if is_raspberry_pi:
 else:
     logger.info("Running in simulation mode")
     # Import simulation module
-    from hardware_simulator import GPIO, read_dht22, setup_door_sensor, read_door_sensor, setup_relay, set_relay_state, activate_buzzer
+    from hardware_simulator import GPIO, read_dht22, setup_door_sensor, read_door_sensor, setup_relay, set_relay_state, set_buzzer_state
 
 from app import db
-from models import Fridge, TemperatureReading, DoorEvent, Alert
+from models import Fridge, DoorEvent, Alert
+from ingestion import reading_buffer
+from reading_cache import recent_readings
+from events import broker, alert_payload
+from cache import response_cache
+from pipeline import Pipeline, Stage
+from actuators import ActuatorScheduler
+from polling import poll_scheduler
+from fridge_config import fridge_configs
+from clock import clock
 
 # Dictionary to keep track of door open timestamps
 door_open_times = {}
 # Lock for thread safety
 lock = threading.Lock()
+# Worker pool used to read DHT22 sensors concurrently
+sensor_executor = ThreadPoolExecutor(
+    max_workers=Config.SENSOR_POLL_WORKERS,
+    thread_name_prefix='dht22'
+)
+# Sensor reads still in progress, keyed by DHT22 pin
+pending_reads = {}
+# Guards pending_reads, shared by the acquire stage workers
+pending_reads_lock = threading.Lock()
+# Door edges (fridge_id, is_open, timestamp) waiting to be persisted
+door_event_queue = queue.SimpleQueue()
+# Replays install a function here returning fridge_id -> (temperature, humidity)
+# for a list of fridges, replacing the DHT22 reads
+reading_source = None
+# Compressor state last commanded per fridge, so rule evaluation needs no database access
+compressor_states = {}
+# (fridge_id, alert_type) -> time a repeating alert was last raised
+alert_repeat_times = {}
+
+# Items passed between the ingestion pipeline stages
+Sample = namedtuple('Sample', ['fridge', 'temperature', 'humidity', 'timestamp'])
+AlertRequest = namedtuple('AlertRequest', ['alert_type', 'message', 'buzz_seconds', 'unique'])
+Decision = namedtuple('Decision', ['sample', 'compressor', 'alerts'])
 
 if is_raspberry_pi:
     # Real hardware implementations for Raspberry Pi
@@ -78,140 +112,417 @@ if is_raspberry_pi:
             logger.error(f"Error setting relay state: {e}")
             return False
 
-    def activate_buzzer(duration=1.0):
-        """Activate buzzer for specified duration in seconds"""
+    def set_buzzer_state(state):
+        """Switch the buzzer on or off (True = ON, False = OFF)"""
         try:
-            GPIO.output(BUZZER_PIN, GPIO.HIGH)
-            time.sleep(duration)
-            GPIO.output(BUZZER_PIN, GPIO.LOW)
+            GPIO.output(BUZZER_PIN, GPIO.HIGH if state else GPIO.LOW)
+            return True
         except Exception as e:
-            logger.error(f"Error activating buzzer: {e}")
+            logger.error(f"Error setting buzzer state: {e}")
+            return False
 # Simulation implementations are imported at the top when not on Raspberry Pi
 
-def door_callback(channel, fridge_id):
-    """Callback function for door sensor state change"""
+# Buzzer sounds and relay switching run on their own thread so they never
+# hold up the polling loop
+actuators = ActuatorScheduler(set_buzzer_state, set_relay_state)
+
+def activate_buzzer(duration=1.0):
+    """Sound the buzzer for `duration` seconds without blocking"""
+    actuators.buzz(duration)
+
+def door_callback(channel, fridge_id, is_open=None):
+    """
+    Callback function for door sensor state change
+    
+    Runs in the GPIO edge-detection thread, so it only timestamps the edge and
+    queues it; DoorEventWorker persists it. Replays pass the door state in
+    `is_open` instead of having the sensor read.
+    """
     try:
-        is_open = read_door_sensor(channel)
-        with lock:
-            fridge = Fridge.query.get(fridge_id)
-            if not fridge:
-                logger.error(f"Fridge with ID {fridge_id} not found")
-                return
-                
-            logger.debug(f"Door sensor triggered: Fridge {fridge.name}, Door {'Open' if is_open else 'Closed'}")
+        if is_open is None:
+            is_open = read_door_sensor(channel)
+        door_event_queue.put((fridge_id, is_open, clock.utcnow()))
+    except Exception as e:
+        logger.error(f"Error in door callback: {e}")
+
+def debounce_door_edges(edges, debounce_seconds=Config.DOOR_DEBOUNCE_SECONDS):
+    """
+    Collapse bursts of door edges per fridge, keeping the last state of each burst
+    
+    Edges are (fridge_id, is_open, timestamp) tuples in arrival order; edges of
+    the same fridge less than `debounce_seconds` apart belong to one burst.
+    """
+    result = []
+    last_index = {}
+    for fridge_id, is_open, timestamp in edges:
+        index = last_index.get(fridge_id)
+        if index is not None and (timestamp - result[index][2]).total_seconds() < debounce_seconds:
+            # Keep the settled state but the time the burst started
+            result[index] = (fridge_id, is_open, result[index][2])
+            continue
+        last_index[fridge_id] = len(result)
+        result.append((fridge_id, is_open, timestamp))
+    return result
+
+def process_door_edges(edges):
+    """
+    Persist a batch of door edges in one transaction
+    
+    Edges that do not change a fridge's door state (bounces, repeated edges)
+    are dropped. Requires an application context.
+    """
+    from dashboard import get_latest_door_states
+    
+    edges = debounce_door_edges(edges)
+    fridge_ids = {fridge_id for fridge_id, _, _ in edges}
+    known_ids = fridge_ids & fridge_configs.current().fridges.keys()
+    for fridge_id in fridge_ids - known_ids:
+        logger.error(f"Fridge with ID {fridge_id} not found")
+    
+    door_states = get_latest_door_states(list(known_ids)) if known_ids else {}
+    
+    events = []
+    closed_ids = set()
+    with lock:
+        for fridge_id, is_open, timestamp in edges:
+            if fridge_id not in known_ids or door_states[fridge_id] == is_open:
+                continue
+            door_states[fridge_id] = is_open
+            logger.debug(f"Door sensor triggered: Fridge {fridge_id}, Door {'Open' if is_open else 'Closed'}")
             
-            # Record door event
-            event = DoorEvent(
-                fridge_id=fridge_id,
-                event_type='open' if is_open else 'close',
-                timestamp=datetime.utcnow()
-            )
-            db.session.add(event)
+            events.append({
+                'fridge_id': fridge_id,
+                'event_type': 'open' if is_open else 'close',
+                'timestamp': timestamp
+            })
+            
+            # Sample fast to catch the temperature rise and the recovery afterwards
+            poll_scheduler.boost(fridge_id)
             
             # Handle door open/close
             if is_open:
-                door_open_times[fridge_id] = datetime.utcnow()
+                door_open_times[fridge_id] = timestamp
+                closed_ids.discard(fridge_id)
             else:
                 # Clear door open time when closed
-                if fridge_id in door_open_times:
-                    del door_open_times[fridge_id]
-                    
-                # Clear any active door open alerts
-                active_alerts = Alert.query.filter_by(
-                    fridge_id=fridge_id,
-                    alert_type='door_open',
-                    acknowledged=False
-                ).all()
-                
-                for alert in active_alerts:
-                    alert.acknowledged = True
+                door_open_times.pop(fridge_id, None)
+                closed_ids.add(fridge_id)
+        
+        if not events:
+            return 0
+        
+        db.session.execute(DoorEvent.__table__.insert(), events)
+        
+        # Clear any active door open alerts of fridges that ended up closed
+        cleared_alerts = Alert.query.filter(
+            Alert.fridge_id.in_(closed_ids),
+            Alert.alert_type == 'door_open',
+            Alert.acknowledged == False
+        ).all() if closed_ids else []
+        
+        for alert in cleared_alerts:
+            alert.acknowledged = True
+        cleared = [(alert.fridge_id, alert.id) for alert in cleared_alerts]
+        
+        db.session.commit()
+    
+    # Push the changes to live dashboards
+    for fridge_id in {event['fridge_id'] for event in events}:
+        response_cache.invalidate_fridge(fridge_id)
+    for event in events:
+        broker.publish('door', event['fridge_id'], {
+            'open': event['event_type'] == 'open',
+            'timestamp': event['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+        })
+    for fridge_id in {fridge_id for fridge_id, _ in cleared}:
+        broker.publish('alerts_acknowledged', fridge_id, {
+            'ids': [alert_id for alert_fridge_id, alert_id in cleared if alert_fridge_id == fridge_id]
+        })
+    return len(events)
+
+def drain_door_queue():
+    """Take every queued door edge without blocking"""
+    edges = []
+    while True:
+        try:
+            edges.append(door_event_queue.get_nowait())
+        except queue.Empty:
+            return edges
+
+class DoorEventWorker:
+    """Background consumer persisting queued door edges inside an app context"""
+    def __init__(self, app, batch_seconds=Config.DOOR_EVENT_BATCH_SECONDS):
+        self.app = app
+        self.batch_seconds = batch_seconds
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='door-events', daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = door_event_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
             
-            db.session.commit()
-    except Exception as e:
-        logger.error(f"Error in door callback: {e}")
+            # Give a bouncing contact time to settle, then take everything queued
+            time.sleep(self.batch_seconds)
+            edges = [first] + drain_door_queue()
+            
+            with self.app.app_context():
+                try:
+                    process_door_edges(edges)
+                except Exception as e:
+                    logger.error(f"Error persisting door events: {e}")
+                    db.session.rollback()
 
-def check_fridges():
-    """Check all fridges for temperature, door status, and alerts"""
+def acquire_readings(fridges, timeout=Config.SENSOR_READ_TIMEOUT_SECONDS):
+    """
+    Read the DHT22 sensor of every fridge concurrently
+    
+    Returns a dict of fridge_id -> (temperature, humidity). Sensors that have not
+    answered before the deadline are reported as (None, None); their read is left
+    running in the background and no new read is started on that pin until it ends.
+    """
+    futures = {}
+    for fridge in fridges:
+        pin = fridge.dht22_pin
+        with pending_reads_lock:
+            future = pending_reads.get(pin)
+            if future is not None and not future.done():
+                logger.warning(f"DHT22 on pin {pin} is still busy from a previous cycle, skipping")
+                continue
+            future = sensor_executor.submit(read_dht22, pin)
+            pending_reads[pin] = future
+        futures[fridge.id] = future
+    
+    done, _ = wait(set(futures.values()), timeout=timeout)
+    
+    readings = {}
+    for fridge in fridges:
+        future = futures.get(fridge.id)
+        if future is None or future not in done:
+            if future is not None and future.cancel():
+                # Never started, so nothing is holding the pin
+                with pending_reads_lock:
+                    if pending_reads.get(fridge.dht22_pin) is future:
+                        del pending_reads[fridge.dht22_pin]
+            else:
+                logger.error(f"Timed out reading DHT22 sensor on pin {fridge.dht22_pin}")
+            readings[fridge.id] = (None, None)
+            continue
+        try:
+            readings[fridge.id] = future.result()
+        except Exception as e:
+            logger.error(f"Error reading DHT22 sensor: {e}")
+            readings[fridge.id] = (None, None)
+    
+    return readings
+
+def acquire_samples(fridges):
+    """Acquire stage: read the sensors of a batch of fridges"""
+    source = reading_source or acquire_readings
+    readings = source(fridges)
+    return [
+        Sample(fridge, *readings.get(fridge.id, (None, None)), clock.utcnow())
+        for fridge in fridges
+    ]
+
+def evaluate_samples(samples):
+    """
+    Evaluate stage: apply the alert and compressor rules to each sample
+    
+    Only in-memory state is used here, so rule evaluation never waits on the
+    database. Alerts that must not be duplicated are checked in the persist stage.
+    """
+    decisions = []
+    for sample in samples:
+        fridge = sample.fridge
+        temperature = sample.temperature
+        compressor = None
+        alerts = []
+        
+        if temperature is not None and sample.humidity is not None:
+            recent_readings.record(fridge.id, temperature, sample.humidity, sample.timestamp)
+            
+            # Check temperature against thresholds
+            if temperature > fridge.max_temp_threshold:
+                alerts.append(AlertRequest('temp_high', f"Temperature too high: {temperature:.1f}°C", 0.5, False))
+            elif temperature < fridge.min_temp_threshold:
+                alerts.append(AlertRequest('temp_low', f"Temperature too low: {temperature:.1f}°C", 0.5, False))
+            
+            # Control compressor based on temperature
+            should_compressor_run = temperature > fridge.target_temp
+            if should_compressor_run != compressor_states.get(fridge.id, fridge.compressor_status):
+                compressor_states[fridge.id] = should_compressor_run
+                compressor = should_compressor_run
+            
+            # Check for defrosting (rapid temperature increase)
+            recent_temps = recent_readings.recent_temperatures(fridge.id, 5)
+            if len(recent_temps) >= 5:
+                oldest_temp = recent_temps[-1]
+                if temperature > oldest_temp + 3.0:  # 3°C increase in short time suggests defrosting
+                    alerts.append(AlertRequest('defrosting', "Rapid temperature increase detected, possible defrosting", 0.5, False))
+        
+        # Check door status (from saved state)
+        door_opened_at = door_open_times.get(fridge.id)
+        if door_opened_at is not None:
+            door_open_duration = (sample.timestamp - door_opened_at).total_seconds()
+            if door_open_duration > fridge.door_open_alert_seconds:
+                alerts.append(AlertRequest('door_open', f"Door has been open for {int(door_open_duration)} seconds", 1.0, True))
+        
+        # Check if maintenance is due
+        if fridge.days_until_maintenance(sample.timestamp) <= 0:
+            alerts.append(AlertRequest('maintenance_due', "Annual maintenance is due", None, True))
+        
+        # Sample faster while something is going on, back off when stable
+        excursion = door_opened_at is not None or any(alert.alert_type != 'maintenance_due' for alert in alerts)
+        poll_scheduler.observe(fridge.id, temperature, excursion, sample.timestamp)
+        
+        # Conditions that persist repeat their alert at most once per base
+        # polling interval, however fast the fridge is being sampled
+        alerts = [alert for alert in alerts if alert.unique or repeat_due(fridge, alert.alert_type, sample.timestamp)]
+        
+        if temperature is not None or compressor is not None or alerts:
+            decisions.append(Decision(sample, compressor, alerts))
+    return decisions
+
+def repeat_due(fridge, alert_type, now):
+    """Whether a repeating alert may be raised again, recording it if so"""
+    key = (fridge.id, alert_type)
+    interval = fridge.poll_interval_seconds or Config.POLL_INTERVAL_SECONDS
+    last = alert_repeat_times.get(key)
+    # A little slack so scheduling jitter does not skip a whole interval
+    if last is not None and (now - last).total_seconds() < interval * 0.9:
+        return False
+    alert_repeat_times[key] = now
+    return True
+
+def actuate_decisions(decisions):
+    """Actuate stage: queue compressor relay changes and buzzer sounds for new alerts"""
+    for decision in decisions:
+        if decision.compressor is not None:
+            # The relay may have been moved to another pin since the sample was taken
+            fridge = fridge_configs.current().get(decision.sample.fridge.id) or decision.sample.fridge
+            actuators.set_relay(fridge.relay_pin, decision.compressor)
+        for alert in decision.alerts:
+            # Unique alerts only buzz once the persist stage knows they are new
+            if alert.buzz_seconds and not alert.unique:
+                activate_buzzer(alert.buzz_seconds)
+    return decisions
+
+def persist_decisions(decisions):
+    """Persist stage: write readings, compressor state and alerts in one transaction"""
+    events = []
+    buzz_seconds = []
     try:
         with lock:
-            fridges = Fridge.query.all()
+            # One query for the alert types that must not be raised twice
+            unique = {(decision.sample.fridge.id, alert.alert_type)
+                      for decision in decisions for alert in decision.alerts if alert.unique}
+            active = set()
+            if unique:
+                active = set(db.session.query(Alert.fridge_id, Alert.alert_type).filter(
+                    Alert.fridge_id.in_({fridge_id for fridge_id, _ in unique}),
+                    Alert.alert_type.in_({alert_type for _, alert_type in unique}),
+                    Alert.acknowledged == False
+                ).distinct())
             
-            for fridge in fridges:
-                # Read temperature and humidity
-                temperature, humidity = read_dht22(fridge.dht22_pin)
-                if temperature is not None and humidity is not None:
-                    # Store reading
-                    reading = TemperatureReading(
-                        fridge_id=fridge.id,
-                        temperature=temperature,
-                        humidity=humidity
-                    )
-                    db.session.add(reading)
-                    
-                    # Check temperature against thresholds
-                    if temperature > fridge.max_temp_threshold:
-                        create_alert(fridge.id, 'temp_high', f"Temperature too high: {temperature:.1f}°C")
-                        activate_buzzer(0.5)
-                    elif temperature < fridge.min_temp_threshold:
-                        create_alert(fridge.id, 'temp_low', f"Temperature too low: {temperature:.1f}°C")
-                        activate_buzzer(0.5)
-                    
-                    # Control compressor based on temperature
-                    should_compressor_run = temperature > fridge.target_temp
-                    if should_compressor_run != fridge.compressor_status:
-                        fridge.compressor_status = should_compressor_run
-                        set_relay_state(fridge.relay_pin, should_compressor_run)
-                    
-                    # Check for defrosting (rapid temperature increase)
-                    recent_readings = TemperatureReading.query.filter_by(
-                        fridge_id=fridge.id
-                    ).order_by(TemperatureReading.timestamp.desc()).limit(5).all()
-                    
-                    if len(recent_readings) >= 5:
-                        oldest_temp = recent_readings[-1].temperature
-                        if temperature > oldest_temp + 3.0:  # 3°C increase in short time suggests defrosting
-                            create_alert(fridge.id, 'defrosting', "Rapid temperature increase detected, possible defrosting")
-                            activate_buzzer(0.5)
+            for decision in decisions:
+                sample = decision.sample
+                fridge_id = sample.fridge.id
+                if sample.temperature is not None and sample.humidity is not None:
+                    reading_buffer.add(fridge_id, sample.temperature, sample.humidity, sample.timestamp)
+                    events.append(('reading', fridge_id, {
+                        'temperature': round(sample.temperature, 1),
+                        'humidity': round(sample.humidity, 1),
+                        'timestamp': sample.timestamp.strftime('%Y-%m-%d %H:%M:%S')
+                    }))
                 
-                # Check door status (from saved state)
-                if fridge.id in door_open_times:
-                    door_open_duration = (datetime.utcnow() - door_open_times[fridge.id]).total_seconds()
-                    if door_open_duration > fridge.door_open_alert_seconds:
-                        # Check if alert already exists
-                        existing_alert = Alert.query.filter_by(
-                            fridge_id=fridge.id,
-                            alert_type='door_open',
-                            acknowledged=False
-                        ).first()
-                        
-                        if not existing_alert:
-                            create_alert(
-                                fridge.id, 
-                                'door_open', 
-                                f"Door has been open for {int(door_open_duration)} seconds"
-                            )
-                            activate_buzzer(1.0)
+                if decision.compressor is not None:
+                    db.session.execute(
+                        Fridge.__table__.update()
+                        .where(Fridge.id == fridge_id)
+                        .values(compressor_status=decision.compressor)
+                    )
+                    events.append(('compressor', fridge_id, {'running': decision.compressor}))
                 
-                # Check if maintenance is due
-                days_until_maintenance = fridge.days_until_maintenance()
-                if days_until_maintenance <= 0:
-                    # Check if alert already exists
-                    existing_alert = Alert.query.filter_by(
-                        fridge_id=fridge.id,
-                        alert_type='maintenance_due',
-                        acknowledged=False
-                    ).first()
-                    
-                    if not existing_alert:
-                        create_alert(
-                            fridge.id, 
-                            'maintenance_due', 
-                            "Annual maintenance is due"
-                        )
+                for alert in decision.alerts:
+                    if alert.unique:
+                        if (fridge_id, alert.alert_type) in active:
+                            continue
+                        active.add((fridge_id, alert.alert_type))
+                        if alert.buzz_seconds:
+                            buzz_seconds.append(alert.buzz_seconds)
+                    create_alert(fridge_id, alert.alert_type, alert.message)
+            
+            if reading_buffer.should_flush():
+                reading_buffer.flush()
             
             db.session.commit()
+    except Exception:
+        db.session.rollback()
+        db.session.info.pop('new_alerts', None)
+        raise
+    
+    for seconds in buzz_seconds:
+        activate_buzzer(seconds)
+    
+    new_alerts = db.session.info.pop('new_alerts', [])
+    for fridge_id in {fridge_id for _, fridge_id, _ in events} | {alert.fridge_id for alert in new_alerts}:
+        response_cache.invalidate_fridge(fridge_id)
+    
+    for event_type, fridge_id, data in events:
+        broker.publish(event_type, fridge_id, data)
+    for alert in new_alerts:
+        broker.publish('alert', alert.fridge_id, alert_payload(alert))
+
+def is_plain_reading(decision):
+    """Whether a decision only carries a reading, with no alert or compressor change to record"""
+    return not decision.alerts and decision.compressor is None
+
+# acquire -> evaluate -> actuate -> persist. Sensor polls are skipped while the
+# acquire queue is full, evaluation and actuation apply backpressure, and the
+# persist queue sheds its oldest plain readings rather than hold up compressor
+# control. Decisions with alerts or compressor changes are never dropped.
+ingestion_pipeline = Pipeline(
+    Stage('acquire', acquire_samples, maxsize=Config.PIPELINE_QUEUE_SIZE,
+          workers=Config.SENSOR_POLL_WORKERS, overflow='drop_newest'),
+    Stage('evaluate', evaluate_samples, maxsize=Config.PIPELINE_QUEUE_SIZE,
+          batch_size=Config.PIPELINE_QUEUE_SIZE),
+    Stage('actuate', actuate_decisions, maxsize=Config.PIPELINE_QUEUE_SIZE,
+          batch_size=Config.PIPELINE_QUEUE_SIZE),
+    Stage('persist', persist_decisions, maxsize=Config.PIPELINE_PERSIST_QUEUE_SIZE,
+          batch_size=Config.READING_BATCH_SIZE, overflow='drop_oldest', sheddable=is_plain_reading)
+)
+
+def check_fridges(fridge_ids=None):
+    """Check all fridges (or only `fridge_ids`) for temperature, door status, and alerts"""
+    try:
+        fridges = fridge_configs.current().select(fridge_ids)
+        
+        if ingestion_pipeline.running:
+            ingestion_pipeline.submit(fridges)
+        else:
+            # Workers not started (tests, benchmarks): run every stage inline
+            ingestion_pipeline.run(fridges)
     except Exception as e:
         logger.error(f"Error checking fridges: {e}")
+        db.session.rollback()
 
 def create_alert(fridge_id, alert_type, message):
     """Create a new alert in the database"""
@@ -219,9 +530,12 @@ def create_alert(fridge_id, alert_type, message):
         alert = Alert(
             fridge_id=fridge_id,
             alert_type=alert_type,
-            message=message
+            message=message,
+            timestamp=clock.utcnow()
         )
         db.session.add(alert)
+        # Remembered so the caller can publish it once committed
+        db.session.info.setdefault('new_alerts', []).append(alert)
         logger.info(f"Created alert: {alert_type} - {message}")
         return alert
     except Exception as e:
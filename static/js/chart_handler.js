@@ -157,9 +157,103 @@ function createTemperatureChart(canvasId, timestamps, temperatures, humidities,
         }
     });
     
+    // Raw timestamps (shared with the tooltip) and reference line values,
+    // extended by appendTemperatureData
+    tempChart.rawTimestamps = timestamps;
+    tempChart.referenceValues = [targetTemp, minThreshold, maxThreshold];
+    
     return tempChart;
 }
 
+/**
+ * Append new readings to a temperature chart without rebuilding it
+ * @param {Chart} chart - Chart created by createTemperatureChart
+ * @param {Object} data - Response of /api/temperature_data/<id>?since=<cursor>
+ * @param {number|null} maxPoints - Drop the oldest points beyond this many (optional)
+ */
+function appendTemperatureData(chart, data, maxPoints = null) {
+    if (data.timestamps.length === 0) {
+        return;
+    }
+    
+    const datasets = chart.data.datasets;
+    data.timestamps.forEach((ts, i) => {
+        const date = new Date(ts);
+        chart.data.labels.push(date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }));
+        chart.rawTimestamps.push(ts);
+        datasets[0].data.push(data.temperatures[i]);
+        datasets[1].data.push(data.humidities[i]);
+        
+        // Extend the Target, Min and Max reference lines
+        chart.referenceValues.forEach((value, r) => datasets[2 + r].data.push(value));
+    });
+    
+    if (maxPoints !== null) {
+        const excess = chart.data.labels.length - maxPoints;
+        if (excess > 0) {
+            chart.data.labels.splice(0, excess);
+            chart.rawTimestamps.splice(0, excess);
+            datasets.forEach(dataset => dataset.data.splice(0, excess));
+        }
+    }
+    
+    chart.update('none');
+}
+
+/**
+ * Add one live reading to a temperature chart
+ *
+ * On a chart of raw readings (bucketSeconds 0) the reading becomes a new
+ * point. On a downsampled chart it is folded into the running average of the
+ * newest bucket, or starts the next bucket once it falls past its end, so the
+ * chart keeps a single resolution. Readings at or before the last one added
+ * are ignored, which makes resynchronising after a reconnect safe.
+ * @param {Chart} chart - Chart created by createTemperatureChart
+ * @param {Object} reading - {timestamp, temperature, humidity}
+ * @param {number} bucketSeconds - Bucket width of the chart data (0 = raw readings)
+ * @param {number|null} maxPoints - Drop the oldest points beyond this many (optional)
+ */
+function addLiveReading(chart, reading, bucketSeconds, maxPoints = null) {
+    const time = new Date(reading.timestamp).getTime();
+    if (chart.lastLiveTime !== undefined && time <= chart.lastLiveTime) {
+        return;
+    }
+    chart.lastLiveTime = time;
+    
+    const datasets = chart.data.datasets;
+    const last = chart.rawTimestamps.length - 1;
+    const width = bucketSeconds * 1000;
+    
+    if (bucketSeconds && last >= 0) {
+        const lastStart = new Date(chart.rawTimestamps[last]).getTime();
+        if (time < lastStart + width) {
+            // Same bucket: update its running average in place
+            const count = chart.lastBucketCount || 0;
+            const fold = (average, value) => Math.round((average * count + value) / (count + 1) * 10) / 10;
+            datasets[0].data[last] = fold(datasets[0].data[last], reading.temperature);
+            datasets[1].data[last] = fold(datasets[1].data[last], reading.humidity);
+            chart.lastBucketCount = count + 1;
+            chart.update('none');
+            return;
+        }
+        
+        // Next bucket, aligned with the ones already on the chart
+        const start = new Date(lastStart + Math.floor((time - lastStart) / width) * width);
+        const pad = n => String(n).padStart(2, '0');
+        reading = Object.assign({}, reading, {
+            timestamp: `${start.getFullYear()}-${pad(start.getMonth() + 1)}-${pad(start.getDate())} ` +
+                       `${pad(start.getHours())}:${pad(start.getMinutes())}:${pad(start.getSeconds())}`
+        });
+    }
+    
+    chart.lastBucketCount = 1;
+    appendTemperatureData(chart, {
+        timestamps: [reading.timestamp],
+        temperatures: [reading.temperature],
+        humidities: [reading.humidity]
+    }, maxPoints);
+}
+
 /**
  * Create a door opening chart
  * @param {string} canvasId - ID of the canvas element
@@ -1,74 +1,234 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from config import Config
+from clock import clock
 from app import db
 from models import Fridge, TemperatureReading, DoorEvent, Alert
 
 logger = logging.getLogger(__name__)
 
+def day_bounds(day=None, tz_name=None):
+    """
+    Return the half-open (start, end) range of a calendar day as naive UTC datetimes
+    
+    The day is interpreted in the site's timezone (Config.SITE_TIMEZONE) so that
+    "today" matches the kitchen's wall clock. Comparing the raw timestamp column
+    against this range keeps day-bucketed queries index-backed.
+    """
+    tz = ZoneInfo(tz_name or Config.SITE_TIMEZONE)
+    if day is None:
+        day = clock.utcnow().replace(tzinfo=timezone.utc).astimezone(tz).date()
+    
+    start = datetime.combine(day, datetime.min.time(), tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+    return (
+        start.astimezone(timezone.utc).replace(tzinfo=None),
+        end.astimezone(timezone.utc).replace(tzinfo=None)
+    )
+
 def cleanup_old_data():
     """Remove old readings to keep the database size manageable"""
+    from retention import run_retention
+    
     try:
-        # Keep temperature readings for 30 days
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
-        
-        # Delete old temperature readings
-        deleted_temp = db.session.query(TemperatureReading).filter(
-            TemperatureReading.timestamp < cutoff_date
-        ).delete()
-        
-        # Keep door events for 60 days
-        cutoff_date = datetime.utcnow() - timedelta(days=60)
-        deleted_door = db.session.query(DoorEvent).filter(
-            DoorEvent.timestamp < cutoff_date
-        ).delete()
-        
-        # Keep acknowledged alerts for 90 days
-        cutoff_date = datetime.utcnow() - timedelta(days=90)
-        deleted_alerts = db.session.query(Alert).filter(
-            Alert.acknowledged == True,
-            Alert.timestamp < cutoff_date
-        ).delete()
-        
-        db.session.commit()
+        results = run_retention()
         
-        logger.info(f"Cleanup complete: Removed {deleted_temp} temperature readings, "
-                   f"{deleted_door} door events, and {deleted_alerts} acknowledged alerts")
+        logger.info(f"Cleanup complete: Removed {results['temperature_reading']['deleted']} temperature readings, "
+                   f"{results['door_event']['deleted']} door events, "
+                   f"{results['alert']['deleted']} acknowledged alerts "
+                   f"and {results['reading_rollup']['deleted']} expired rollups")
+        return results
         
     except Exception as e:
         logger.error(f"Error during data cleanup: {e}")
         db.session.rollback()
 
-def get_temperature_data(fridge_id, days=1):
-    """Get temperature data for charts"""
+def epoch_seconds(column):
+    """SQL expression converting a naive UTC timestamp column to integer epoch seconds"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return db.cast(db.func.floor(db.func.extract('epoch', column)), db.Integer)
+    if dialect in ('mysql', 'mariadb'):
+        return db.func.unix_timestamp(column)
+    return db.cast(db.func.strftime('%s', column), db.Integer)
+
+def add_seconds(column, seconds):
+    """SQL expression adding a fixed number of seconds to a naive timestamp column"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return column + db.func.make_interval(0, 0, 0, 0, 0, 0, seconds)
+    if dialect in ('mysql', 'mariadb'):
+        return db.func.timestampadd(db.text('SECOND'), seconds, column)
+    # Same text layout as stored timestamps, so the comparison stays an index range
+    return db.func.strftime('%Y-%m-%d %H:%M:%f', column, f'+{int(seconds)} seconds')
+
+def get_temperature_data(fridge_id, days=1, points=Config.MAX_CHART_POINTS):
+    """
+    Get temperature data for charts
+    
+    The result carries a `cursor` (the newest reading ID at query time) that can
+    be passed to get_temperature_data_since() to fetch only newer readings.
+    If the window holds more than `points` readings they are averaged into
+    fixed-width time buckets in the database, so the payload stays bounded
+    whatever the range. Downsampled results also carry the per-bucket
+    temperature minimum and maximum and the reading count. When downsampling,
+    buckets of a minute or more are built from the coarsest rollup that fits
+    instead of raw readings.
+    """
+    from rollups import coarsest_resolution
+    
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        # Taken first: a reading arriving meanwhile may be returned twice, but never missed
+        cursor = db.session.query(db.func.max(TemperatureReading.id)).filter(
+            TemperatureReading.fridge_id == fridge_id
+        ).scalar()
+        
+        cutoff_date = clock.utcnow() - timedelta(days=days)
+        bucket_seconds = max(1, -(-days * 86400 // points)) if points else 0
+        cutoff_epoch = int((cutoff_date - datetime(1970, 1, 1)).total_seconds())
         
-        readings = TemperatureReading.query.filter(
+        window = (
             TemperatureReading.fridge_id == fridge_id,
             TemperatureReading.timestamp > cutoff_date
-        ).order_by(TemperatureReading.timestamp.asc()).all()
+        )
         
-        timestamps = [reading.timestamp.strftime('%Y-%m-%d %H:%M:%S') for reading in readings]
-        temperatures = [round(reading.temperature, 1) for reading in readings]
-        humidities = [round(reading.humidity, 1) for reading in readings]
+        # Counting stops past `points`, so long ranges do not scan every reading
+        reading_count = 0
+        if points:
+            limited = db.session.query(TemperatureReading.id).filter(*window).limit(points + 1).subquery()
+            reading_count = db.session.query(db.func.count()).select_from(limited).scalar()
         
+        if not points or reading_count <= points:
+            readings = db.session.query(
+                TemperatureReading.timestamp,
+                TemperatureReading.temperature,
+                TemperatureReading.humidity
+            ).filter(*window).order_by(TemperatureReading.timestamp.asc()).all()
+            
+            return {
+                'timestamps': [timestamp.strftime('%Y-%m-%d %H:%M:%S') for timestamp, _, _ in readings],
+                'temperatures': [round(temperature, 1) for _, temperature, _ in readings],
+                'humidities': [round(humidity, 1) for _, _, humidity in readings],
+                'bucket_seconds': 0,
+                'cursor': cursor
+            }
+        
+        resolution = coarsest_resolution(bucket_seconds)
+        if resolution is not None:
+            return dict(
+                _get_rollup_temperature_data(fridge_id, cutoff_date, cutoff_epoch, bucket_seconds, resolution),
+                cursor=cursor
+            )
+        
+        # Downsample into buckets of equal width
+        bucket = ((epoch_seconds(TemperatureReading.timestamp) - cutoff_epoch) // bucket_seconds).label('bucket')
+        
+        buckets = db.session.query(
+            bucket,
+            db.func.avg(TemperatureReading.temperature),
+            db.func.min(TemperatureReading.temperature),
+            db.func.max(TemperatureReading.temperature),
+            db.func.avg(TemperatureReading.humidity),
+            db.func.count(TemperatureReading.id)
+        ).filter(*window).group_by(bucket).order_by(bucket).all()
+        
+        return dict(_format_buckets(buckets, cutoff_date, bucket_seconds), cursor=cursor)
+    except Exception as e:
+        logger.error(f"Error getting temperature data: {e}")
         return {
-            'timestamps': timestamps,
-            'temperatures': temperatures,
-            'humidities': humidities
+            'timestamps': [],
+            'temperatures': [],
+            'humidities': [],
+            'bucket_seconds': 0,
+            'cursor': None
+        }
+
+def get_temperature_data_since(fridge_id, since, limit=Config.MAX_CHART_POINTS_LIMIT):
+    """
+    Get readings newer than a cursor, for appending to an existing chart
+    
+    `since` is either a reading ID (as returned in `cursor`) or a timestamp.
+    Returns at most `limit` readings, oldest first, plus the cursor to use for
+    the next call.
+    """
+    try:
+        query = db.session.query(
+            TemperatureReading.id,
+            TemperatureReading.timestamp,
+            TemperatureReading.temperature,
+            TemperatureReading.humidity
+        ).filter(TemperatureReading.fridge_id == fridge_id)
+        
+        if isinstance(since, datetime):
+            query = query.filter(TemperatureReading.timestamp > since)
+        else:
+            query = query.filter(TemperatureReading.id > since)
+        readings = query.order_by(TemperatureReading.id.asc()).limit(limit).all()
+        
+        if readings:
+            cursor = readings[-1][0]
+        elif isinstance(since, datetime):
+            cursor = db.session.query(db.func.max(TemperatureReading.id)).filter(
+                TemperatureReading.fridge_id == fridge_id
+            ).scalar()
+        else:
+            cursor = since
+        
+        return {
+            'timestamps': [timestamp.strftime('%Y-%m-%d %H:%M:%S') for _, timestamp, _, _ in readings],
+            'temperatures': [round(temperature, 1) for _, _, temperature, _ in readings],
+            'humidities': [round(humidity, 1) for _, _, _, humidity in readings],
+            'cursor': cursor
         }
     except Exception as e:
-        logger.error(f"Error getting temperature data: {e}")
+        logger.error(f"Error getting temperature data since {since}: {e}")
         return {
             'timestamps': [],
             'temperatures': [],
-            'humidities': []
+            'humidities': [],
+            'cursor': since if not isinstance(since, datetime) else None
         }
 
+def _get_rollup_temperature_data(fridge_id, cutoff_date, cutoff_epoch, bucket_seconds, resolution):
+    """Chart buckets of `bucket_seconds` built by merging rollups of `resolution`"""
+    from models import ReadingRollup
+    
+    bucket = ((epoch_seconds(ReadingRollup.bucket_start) - cutoff_epoch) // bucket_seconds).label('bucket')
+    buckets = db.session.query(
+        bucket,
+        db.func.sum(ReadingRollup.temperature_sum) / db.func.sum(ReadingRollup.count),
+        db.func.min(ReadingRollup.temperature_min),
+        db.func.max(ReadingRollup.temperature_max),
+        db.func.sum(ReadingRollup.humidity_sum) / db.func.sum(ReadingRollup.count),
+        db.func.sum(ReadingRollup.count)
+    ).filter(
+        ReadingRollup.fridge_id == fridge_id,
+        ReadingRollup.resolution == resolution,
+        ReadingRollup.bucket_start >= cutoff_date
+    ).group_by(bucket).order_by(bucket).all()
+    
+    return _format_buckets(buckets, cutoff_date, bucket_seconds)
+
+def _format_buckets(buckets, cutoff_date, bucket_seconds):
+    """Chart payload from (index, avg temp, min temp, max temp, avg humidity, count) rows"""
+    return {
+        'timestamps': [
+            (cutoff_date + timedelta(seconds=index * bucket_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+            for index, _, _, _, _, _ in buckets
+        ],
+        'temperatures': [round(avg_temp, 1) for _, avg_temp, _, _, _, _ in buckets],
+        'temperature_min': [round(min_temp, 1) for _, _, min_temp, _, _, _ in buckets],
+        'temperature_max': [round(max_temp, 1) for _, _, _, max_temp, _, _ in buckets],
+        'humidities': [round(avg_humidity, 1) for _, _, _, _, avg_humidity, _ in buckets],
+        'counts': [count for _, _, _, _, _, count in buckets],
+        'bucket_seconds': bucket_seconds
+    }
+
 def get_door_events(fridge_id, days=1):
     """Get door events for the specified number of days"""
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff_date = clock.utcnow() - timedelta(days=days)
         
         events = DoorEvent.query.filter(
             DoorEvent.fridge_id == fridge_id,
@@ -82,47 +242,85 @@ def get_door_events(fridge_id, days=1):
 
 def calculate_daily_stats(fridge_id):
     """Calculate daily statistics for a fridge"""
-    today = datetime.utcnow().date()
+    day_start, day_end = day_bounds()
     
     # Get door open count
     door_open_count = DoorEvent.query.filter(
         DoorEvent.fridge_id == fridge_id,
         DoorEvent.event_type == 'open',
-        db.func.date(DoorEvent.timestamp) == today
+        DoorEvent.timestamp >= day_start,
+        DoorEvent.timestamp < day_end
     ).count()
     
     # Get average temperature for today
-    today_readings = TemperatureReading.query.filter(
-        TemperatureReading.fridge_id == fridge_id,
-        db.func.date(TemperatureReading.timestamp) == today
-    ).all()
-    
-    avg_temp = sum(reading.temperature for reading in today_readings) / len(today_readings) if today_readings else None
-    avg_humidity = sum(reading.humidity for reading in today_readings) / len(today_readings) if today_readings else None
+    from rollups import get_average_readings
+    avg_temp, avg_humidity = get_average_readings([fridge_id], day_start, day_end).get(fridge_id, (None, None))
     
     # Calculate average recovery time
-    recovery_times = []
-    door_close_events = DoorEvent.query.filter(
-        DoorEvent.fridge_id == fridge_id,
-        DoorEvent.event_type == 'close',
-        db.func.date(DoorEvent.timestamp) == today
-    ).order_by(DoorEvent.timestamp.asc()).all()
+    recovery_times = [
+        seconds for _, seconds in get_recovery_times(
+            [fridge_id], since=day_start, until=day_end
+        )[fridge_id]
+    ]
+    
+    return format_daily_stats(door_open_count, avg_temp, avg_humidity, recovery_times)
+
+def get_recovery_times(fridge_ids, since=None, until=None, last_only=False):
+    """
+    Compute recovery times (seconds from a door close until the first reading at
+    or below the fridge's target temperature) in a single query
     
-    fridge = db.session.query(Fridge).get(fridge_id)
-    target_temp = fridge.target_temp if fridge else 4.0
+    Args:
+        fridge_ids: Fridges to compute recovery times for
+        since, until: Optional half-open range of door close timestamps
+        last_only: Only consider the most recent door close of each fridge
     
-    for event in door_close_events:
-        # Find the next temperature reading that is at or below the target
-        recovery_reading = TemperatureReading.query.filter(
-            TemperatureReading.fridge_id == fridge_id,
-            TemperatureReading.temperature <= target_temp,
-            TemperatureReading.timestamp > event.timestamp
-        ).order_by(TemperatureReading.timestamp.asc()).first()
-        
-        if recovery_reading:
-            recovery_time = (recovery_reading.timestamp - event.timestamp).total_seconds()
-            recovery_times.append(recovery_time)
+    Returns a dict of fridge_id -> list of (close timestamp, seconds), oldest
+    first. Door closes not followed by a recovery within MAX_RECOVERY_SECONDS
+    are left out; the bound keeps each lookup to a short index range.
+    """
+    recovered_at = db.select(
+        db.func.min(TemperatureReading.timestamp)
+    ).where(
+        TemperatureReading.fridge_id == DoorEvent.fridge_id,
+        TemperatureReading.temperature <= Fridge.target_temp,
+        TemperatureReading.timestamp > DoorEvent.timestamp,
+        TemperatureReading.timestamp <= add_seconds(DoorEvent.timestamp, Config.MAX_RECOVERY_SECONDS)
+    ).correlate(DoorEvent, Fridge).scalar_subquery()
     
+    query = db.session.query(
+        DoorEvent.fridge_id,
+        DoorEvent.timestamp,
+        recovered_at
+    ).join(Fridge, Fridge.id == DoorEvent.fridge_id).filter(
+        DoorEvent.fridge_id.in_(fridge_ids),
+        DoorEvent.event_type == 'close'
+    )
+    if since is not None:
+        query = query.filter(DoorEvent.timestamp >= since)
+    if until is not None:
+        query = query.filter(DoorEvent.timestamp < until)
+    if last_only:
+        last_close = db.session.query(
+            DoorEvent.fridge_id.label('fridge_id'),
+            db.func.max(DoorEvent.timestamp).label('timestamp')
+        ).filter(
+            DoorEvent.fridge_id.in_(fridge_ids),
+            DoorEvent.event_type == 'close'
+        ).group_by(DoorEvent.fridge_id).subquery()
+        query = query.join(last_close, db.and_(
+            last_close.c.fridge_id == DoorEvent.fridge_id,
+            last_close.c.timestamp == DoorEvent.timestamp
+        ))
+    
+    recovery_times = {fridge_id: [] for fridge_id in fridge_ids}
+    for fridge_id, closed_at, recovered in query.order_by(DoorEvent.timestamp.asc()).all():
+        if recovered is not None:
+            recovery_times[fridge_id].append((closed_at, (recovered - closed_at).total_seconds()))
+    return recovery_times
+
+def format_daily_stats(door_open_count, avg_temp, avg_humidity, recovery_times):
+    """Build the daily statistics dict shared by the dashboard and the API"""
     avg_recovery_time = sum(recovery_times) / len(recovery_times) if recovery_times else None
     
     return {
@@ -139,6 +337,11 @@ def acknowledge_alert(alert_id):
         if alert:
             alert.acknowledged = True
             db.session.commit()
+            
+            from cache import response_cache
+            from events import broker
+            response_cache.invalidate_fridge(alert.fridge_id)
+            broker.publish('alerts_acknowledged', alert.fridge_id, {'ids': [alert.id]})
             return True
         return False
     except Exception as e:
@@ -177,6 +380,14 @@ def log_maintenance(fridge_id, description, performed_by):
         db.session.add(record)
         db.session.commit()
         
+        from cache import response_cache
+        from fridge_config import fridge_configs
+        response_cache.invalidate_fridge(fridge_id)
+        fridge_configs.refresh()
+        if fridge and alerts:
+            from events import broker
+            broker.publish('alerts_acknowledged', fridge_id, {'ids': [alert.id for alert in alerts]})
+        
         return True
     except Exception as e:
         logger.error(f"Error logging maintenance: {e}")
@@ -205,6 +416,14 @@ def reset_maintenance_date(fridge_id):
                 alert.acknowledged = True
                 
             db.session.commit()
+            
+            from cache import response_cache
+            from fridge_config import fridge_configs
+            response_cache.invalidate_fridge(fridge_id)
+            fridge_configs.refresh()
+            if alerts:
+                from events import broker
+                broker.publish('alerts_acknowledged', fridge_id, {'ids': [alert.id for alert in alerts]})
             return True
         return False
     except Exception as e:
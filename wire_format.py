@@ -0,0 +1,101 @@
+"""
+Compact columnar encodings of temperature time series for bulk export
+
+Rows are read with a Core select (no ORM objects) as epoch seconds plus raw
+values, then encoded as either:
+
+compact JSON
+    {"start": <epoch of first reading>, "deltas": [seconds since previous],
+     "temperatures": [...], "humidities": [...]}
+
+packed binary (application/octet-stream), all little-endian:
+    4s  magic b'FMTS'
+    B   format version (1)
+    3x  padding
+    I   reading count N
+    q   epoch seconds of the first reading
+    N x I   timestamp deltas in seconds (first is 0)
+    N x f   temperatures (float32)
+    N x f   humidities (float32)
+
+Arrow IPC stream (application/vnd.apache.arrow.stream), only when pyarrow is
+installed.
+"""
+import struct
+
+from app import db
+from models import TemperatureReading
+from utils import epoch_seconds
+
+# pyarrow is optional
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+BINARY_MIMETYPE = 'application/octet-stream'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+HEADER = struct.Struct('<4sBxxxIq')
+MAGIC = b'FMTS'
+
+def fetch_columns(fridge_id, since, until=None):
+    """Return (epochs, temperatures, humidities) for a fridge, oldest first"""
+    query = db.select(
+        epoch_seconds(TemperatureReading.timestamp),
+        TemperatureReading.temperature,
+        TemperatureReading.humidity
+    ).where(
+        TemperatureReading.fridge_id == fridge_id,
+        TemperatureReading.timestamp >= since
+    )
+    if until is not None:
+        query = query.where(TemperatureReading.timestamp < until)
+    rows = db.session.execute(query.order_by(TemperatureReading.timestamp.asc())).all()
+    
+    if not rows:
+        return [], [], []
+    epochs, temperatures, humidities = map(list, zip(*rows))
+    return epochs, temperatures, humidities
+
+def _deltas(epochs):
+    if not epochs:
+        return []
+    return [0] + [current - previous for previous, current in zip(epochs, epochs[1:])]
+
+def encode_json(epochs, temperatures, humidities):
+    """Delta-encoded compact JSON payload"""
+    return {
+        'start': epochs[0] if epochs else None,
+        'deltas': _deltas(epochs),
+        'temperatures': [round(value, 1) for value in temperatures],
+        'humidities': [round(value, 1) for value in humidities]
+    }
+
+def encode_binary(epochs, temperatures, humidities):
+    """Packed little-endian payload (see module docstring for the layout)"""
+    count = len(epochs)
+    header = HEADER.pack(MAGIC, 1, count, epochs[0] if epochs else 0)
+    # Explicit sizes and byte order, independent of the platform's C types
+    return (header
+            + struct.pack(f'<{count}I', *_deltas(epochs))
+            + struct.pack(f'<{count}f', *temperatures)
+            + struct.pack(f'<{count}f', *humidities))
+
+def encode_arrow(epochs, temperatures, humidities):
+    """Arrow IPC stream with timestamp[s], float32, float32 columns"""
+    table = pyarrow.table({
+        'timestamp': pyarrow.array(epochs, type=pyarrow.timestamp('s')),
+        'temperature': pyarrow.array(temperatures, type=pyarrow.float32()),
+        'humidity': pyarrow.array(humidities, type=pyarrow.float32())
+    })
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def available_mimetypes():
+    """Mimetypes this server can produce, preferred first"""
+    mimetypes = ['application/json', BINARY_MIMETYPE]
+    if pyarrow is not None:
+        mimetypes.append(ARROW_MIMETYPE)
+    return mimetypes